@@ -1,35 +1,243 @@
 # agents/coordinator.py
 
-from agents.ioda_agent import IODAAgent
+import asyncio
+import time
+from agents.ioda_agent import build_ioda_agent
 from agents.news_agent import NewsAgent
 from agents.report_agent import ReportAgent
+from agents.llm_providers import build_router, limit_options
+from utils.report_store import ReportStore, fingerprint_inputs
 from datetime import datetime, timedelta
 
 class Coordinator:
     def __init__(self, config, prompt_template):
-        self.ioda_agent = IODAAgent(config.get("ioda_base_url"))
-        self.news_agent = NewsAgent(config.get("news_api_key"))
-        self.report_agent = ReportAgent(
-            api_key=config.get("openai_api_key"),
-            prompt_template=prompt_template,
-            use_llm=bool(config.get("use_llm", False)),
-            model=config.get("openai_model", "gpt-4o-mini"),
-            temperature=float(config.get("temperature", 0.2)),
-            max_tokens=int(config.get("max_tokens", 800)),
-        )
+        # Agents are built on first use so that constructing a Coordinator
+        # (e.g. per server request) stays cheap
+        self.config = config
+        self.prompt_template = prompt_template
+        self._ioda_agent = None
+        self._news_agent = None
+        self._report_agent = None
+        self._report_store = None
+        self.ioda_max_concurrency = int(config.get("ioda_max_concurrency", 4))
+        self.ioda_chunk_retries = int(config.get("ioda_chunk_retries", 2))
+        self.ioda_max_chunks = int(config.get("ioda_max_chunks", 200))
+        self.incremental_refresh = bool(config.get("incremental_refresh", False))
+        self.incremental_max_age_minutes = float(config.get("incremental_max_age_minutes", 180))
+        self.last_report_id = None
+        self.last_regenerated_sections = None
+        self.last_report_cached = False
+
+    @property
+    def ioda_agent(self):
+        if self._ioda_agent is None:
+            self._ioda_agent = build_ioda_agent(self.config)
+        return self._ioda_agent
+
+    @property
+    def news_agent(self):
+        if self._news_agent is None:
+            self._news_agent = NewsAgent(self.config.get("news_api_key"))
+        return self._news_agent
+
+    @property
+    def report_agent(self):
+        if self._report_agent is None:
+            config = self.config
+            self._report_agent = ReportAgent(
+                api_key=config.get("openai_api_key"),
+                prompt_template=self.prompt_template,
+                use_llm=bool(config.get("use_llm", False)),
+                model=config.get("openai_model", "gpt-4o-mini"),
+                temperature=float(config.get("temperature", 0.2)),
+                max_tokens=int(config.get("max_tokens", 800)),
+                router=build_router(config),
+                mode=config.get("report_mode", "llm"),
+                series_points=int(config.get("prompt_series_points", 24)),
+                **limit_options(config),
+            )
+        return self._report_agent
+
+    @property
+    def report_store(self):
+        if self._report_store is None:
+            store_path = self.config.get("report_store_path", "outputs/reports.db")
+            self._report_store = ReportStore(store_path) if store_path else False
+        return self._report_store or None
+
+    def fetch_outage_data(self, location, start_time, end_time, chunk_hours=None):
+        """Fetch IODA data, splitting the range into parallel chunks if requested."""
+        if chunk_hours:
+            return self.ioda_agent.backfill_outage_data(
+                location,
+                start_time,
+                end_time,
+                chunk_hours=float(chunk_hours),
+                max_concurrency=self.ioda_max_concurrency,
+                retries=self.ioda_chunk_retries,
+                max_chunks=self.ioda_max_chunks,
+            )
+        return self.ioda_agent.fetch_outage_data(location, start_time, end_time)
+
+    def collect_inputs(self, location, start_time, end_time, chunk_hours=None):
+        """
+        Fetches everything a report is generated from, as keyword arguments for generate().
+        """
+        return {
+            "outage_data": self.fetch_outage_data(location, start_time, end_time, chunk_hours),
+            "visualization_url": self.ioda_agent.get_visualization_url(location, start_time, end_time),
+            "news_articles": self.news_agent.fetch_news(location, start_time, end_time),
+        }
 
-    def run(self, location, start_time, end_time, image_base64=None):
+    def run(self, location, start_time, end_time, image_base64=None, chunk_hours=None):
         """
         Coordinates the workflow to generate the outage report.
         """
-        outage_data = self.ioda_agent.fetch_outage_data(location, start_time, end_time)
-        visualization_url = self.ioda_agent.get_visualization_url(location, start_time, end_time)
-        news_articles = self.news_agent.fetch_news(location, start_time, end_time)
-        report = self.report_agent.generate_report(
+        inputs = self.collect_inputs(location, start_time, end_time, chunk_hours)
+        return self.generate(location, start_time, end_time, image_base64=image_base64, **inputs)
+
+    def input_hash(self, location, start_time, end_time, outage_data, news_articles, image_base64=None):
+        """Fingerprint of everything that determines the generated report."""
+        agent = self.report_agent
+        return fingerprint_inputs(
             location=location,
+            window_hours=round((end_time - start_time).total_seconds() / 3600, 3),
+            model=agent.model_label,
+            # Sectioned and single-call reports differ in format, so they never share a cache entry
+            incremental_refresh=self._sectioned(),
+            temperature=agent.temperature,
+            max_tokens=agent.max_tokens,
             outage_data=outage_data,
             news_articles=news_articles,
-            visualization_url=visualization_url,
-            image_base64=image_base64
+            image_base64=image_base64,
         )
+
+    def cached_report(self, location, start_time, end_time, outage_data, news_articles, visualization_url=None, image_base64=None, input_hash=None):
+        """
+        Returns a stored report generated from identical inputs, or None.
+        """
+        if input_hash is None:
+            input_hash = self.input_hash(location, start_time, end_time, outage_data, news_articles, image_base64)
+        return self._lookup(input_hash)
+
+    def _lookup(self, input_hash):
+        if not self.report_store:
+            return None
+        cached = self.report_store.find_by_input_hash(input_hash)
+        if not cached:
+            return None
+        self.last_report_id = cached["id"]
+        self.last_report_cached = True
+        return cached["report"]
+
+    def generate(self, location, start_time, end_time, outage_data, news_articles, visualization_url=None, image_base64=None, input_hash=None):
+        """
+        Generates a report from already-fetched inputs.
+
+        If the report store already holds a report built from identical inputs
+        it is returned instead of generating a new one; otherwise the new report
+        is stored with its metadata. With ``incremental_refresh`` enabled the
+        report is generated section by section, and sections whose inputs did
+        not materially change since the last report for this location are
+        reused rather than regenerated. Pass ``input_hash`` if the caller has
+        already fingerprinted the inputs.
+        """
+        if input_hash is None:
+            input_hash = self.input_hash(location, start_time, end_time, outage_data, news_articles, image_base64)
+
+        cached = self._lookup(input_hash)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        sections = None
+        self.last_regenerated_sections = None
+        if self._sectioned():
+            report, sections, self.last_regenerated_sections = self.report_agent.generate_sections(
+                location,
+                outage_data,
+                news_articles,
+                visualization_url=visualization_url,
+                image_base64=image_base64,
+                previous=self._previous_sections(location),
+            )
+        else:
+            report = self.report_agent.generate_report(
+                location=location,
+                outage_data=outage_data,
+                news_articles=news_articles,
+                visualization_url=visualization_url,
+                image_base64=image_base64
+            )
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        self._store(location, start_time, end_time, report, input_hash, latency_ms, sections)
+        return report
+
+    async def agenerate(self, location, start_time, end_time, outage_data, news_articles, visualization_url=None, image_base64=None, input_hash=None):
+        """
+        Async counterpart of ``generate()`` for callers on an event loop.
+
+        LLM calls go through the router's async path, so waiting on the model
+        holds no thread; fingerprinting and report store access run in a
+        worker thread.
+        """
+        if input_hash is None:
+            input_hash = await asyncio.to_thread(
+                self.input_hash, location, start_time, end_time, outage_data, news_articles, image_base64
+            )
+
+        cached = await asyncio.to_thread(self._lookup, input_hash)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        sections = None
+        self.last_regenerated_sections = None
+        if self._sectioned():
+            previous = await asyncio.to_thread(self._previous_sections, location)
+            report, sections, self.last_regenerated_sections = await self.report_agent.agenerate_sections(
+                location,
+                outage_data,
+                news_articles,
+                visualization_url=visualization_url,
+                image_base64=image_base64,
+                previous=previous,
+            )
+        else:
+            report = await self.report_agent.agenerate_report(
+                location=location,
+                outage_data=outage_data,
+                news_articles=news_articles,
+                visualization_url=visualization_url,
+                image_base64=image_base64
+            )
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        await asyncio.to_thread(self._store, location, start_time, end_time, report, input_hash, latency_ms, sections)
         return report
+
+    def _sectioned(self):
+        return self.incremental_refresh and self.report_agent.llm_enabled
+
+    def _previous_sections(self, location):
+        if not self.report_store:
+            return None
+        since = (datetime.utcnow() - timedelta(minutes=self.incremental_max_age_minutes)).isoformat()
+        return self.report_store.latest_sections(location, since=since)
+
+    def _store(self, location, start_time, end_time, report, input_hash, latency_ms, sections):
+        self.last_report_cached = False
+        self.last_report_id = None
+        # Failed generations are returned to the caller but never cached
+        if self.report_store and not self.report_agent.last_error:
+            self.last_report_id = self.report_store.save(
+                location,
+                report,
+                start_time=start_time,
+                end_time=end_time,
+                model=self.report_agent.last_model or self.report_agent.model_label,
+                input_hash=input_hash,
+                latency_ms=round(latency_ms, 2),
+                sections=sections,
+            )
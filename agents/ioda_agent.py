@@ -4,25 +4,44 @@ This agent is resilient to offline environments and API failures,
 returning None/empty data when requests cannot be completed.
 """
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 import base64
-from datetime import datetime
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 
-try:
-    import httpx
-except Exception:  # pragma: no cover - import safety
-    httpx = None  # type: ignore
+from utils.ioda_stream import SeriesStreamParser
+from utils.lazy import optional_import
+from utils.signals import chunk_windows, merge_series_chunks, to_epoch
 
 
 class IODAAgent:
-    def __init__(self, base_url: Optional[str]):
+    def __init__(self, base_url: Optional[str], compact_series: bool = True):
         self.base_url = base_url or "https://api.ioda.inetintel.cc.gatech.edu/v2"
+        # Stream-parse responses into compact SignalSeries instead of resp.json()
+        self.compact_series = compact_series
+
+    def _get_json(self, client, url: str, params: Dict[str, Any]) -> Optional[Any]:
+        """GET ``url`` and decode the body; None unless the status is 200."""
+        if not self.compact_series:
+            resp = client.get(url, params=params)
+            return resp.json() if resp.status_code == 200 else None
+
+        with client.stream("GET", url, params=params) as resp:
+            if resp.status_code != 200:
+                return None
+            parser = SeriesStreamParser()
+            for text in resp.iter_text():
+                parser.feed(text)
+            return parser.close()
 
     def fetch_outage_data(self, location: str, start_time: datetime, end_time: datetime) -> Optional[Dict[str, Any]]:
         """Fetch outage data from IODA for a given location and time range.
 
         Returns None if the request cannot be completed.
         """
+        httpx = optional_import("httpx")
         if httpx is None:
             return None
 
@@ -35,12 +54,101 @@ class IODAAgent:
 
         try:
             with httpx.Client(timeout=10) as client:
-                resp = client.get(endpoint, params=params)
-                if resp.status_code == 200:
-                    return resp.json()
+                return self._get_json(client, endpoint, params)
         except Exception:
             return None
-        return None
+
+    def backfill_outage_data(
+        self,
+        location: str,
+        start_time: datetime,
+        end_time: datetime,
+        chunk_hours: float = 24,
+        max_concurrency: int = 4,
+        retries: int = 2,
+        max_chunks: int = 200,
+    ) -> Optional[Dict[str, Any]]:
+        """Fetch a long range as aligned chunks in parallel and merge them.
+
+        At most ``max_concurrency`` chunks are in flight at once and each
+        failed chunk is retried on its own up to ``retries`` times. Chunks are
+        widened (to whole hours) when the range would need more than
+        ``max_chunks`` of them. The merged response carries a ``backfill``
+        entry listing any chunks that still failed. Returns None if every
+        chunk failed.
+        """
+        span_hours = (end_time - start_time).total_seconds() / 3600
+        if max_chunks > 1 and span_hours / chunk_hours > max_chunks - 1:
+            # Aligned windows can add one partial chunk at each end
+            chunk_hours = math.ceil(span_hours / (max_chunks - 1))
+        windows = chunk_windows(start_time, end_time, timedelta(hours=chunk_hours))
+        if len(windows) <= 1:
+            return self.fetch_outage_data(location, start_time, end_time)
+
+        def fetch_chunk(window):
+            for attempt in range(retries + 1):
+                data = self.fetch_outage_data(location, window[0], window[1])
+                if data is not None:
+                    return data
+                if attempt < retries:
+                    time.sleep(0.5 * 2 ** attempt)
+            return None
+
+        workers = max(1, min(int(max_concurrency), len(windows)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch_chunk, windows))
+
+        fetched = [r for r in results if r is not None]
+        if not fetched:
+            return None
+
+        failed = [
+            {"start": w[0].isoformat(), "end": w[1].isoformat()}
+            for w, r in zip(windows, results) if r is None
+        ]
+        merged = merge_series_chunks(fetched)
+        if merged is None:
+            # Unrecognised payload shape: hand back the raw chunks in order
+            merged = {"chunks": fetched}
+        merged["backfill"] = {
+            "chunk_hours": chunk_hours,
+            "chunks": len(windows),
+            "failed": failed,
+        }
+        return merged
+
+    def fetch_bulk_signals(
+        self,
+        entity_codes: List[str],
+        start_time: datetime,
+        end_time: datetime,
+        entity_type: str = "country",
+        max_concurrency: int = 8,
+    ) -> Dict[str, Dict[str, Any]]:
+        """Fetch raw signals for many entities over one shared connection pool.
+
+        Returns a mapping of entity code to IODA response; entities whose
+        request failed are left out.
+        """
+        httpx = optional_import("httpx")
+        if httpx is None or not entity_codes:
+            return {}
+
+        params = {"from": to_epoch(start_time), "until": to_epoch(end_time)}
+        workers = max(1, min(int(max_concurrency), len(entity_codes)))
+        limits = httpx.Limits(max_connections=workers, max_keepalive_connections=workers)
+
+        with httpx.Client(timeout=15, limits=limits) as client:
+            def fetch(code):
+                try:
+                    return code, self._get_json(client, f"{self.base_url}/signals/raw/{entity_type}/{code}", params)
+                except Exception:
+                    return code, None
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(fetch, entity_codes))
+
+        return {code: data for code, data in results if data is not None}
 
     def get_visualization_url(self, location: str, start_time: datetime, end_time: datetime) -> str:
         """Construct a best-effort visualization URL for IODA UI."""
@@ -52,3 +160,8 @@ class IODAAgent:
     def encode_image(self, image_path: str) -> str:
         with open(image_path, "rb") as image_file:
             return base64.b64encode(image_file.read()).decode("utf-8")
+
+
+def build_ioda_agent(config: dict) -> IODAAgent:
+    """IODA agent for ``ioda_base_url`` and the other ``ioda_*`` options in the config."""
+    return IODAAgent(config.get("ioda_base_url"), compact_series=config.get("ioda_compact_series", True))
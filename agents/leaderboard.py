@@ -0,0 +1,302 @@
+"""Outage leaderboard: rank many entities by how disrupted they are right now.
+
+Signals for every configured entity are fetched in bulk, scored together
+with vectorised array math (NumPy when installed, a pure-Python fallback
+otherwise) and kept in a precomputed table that a background thread
+refreshes periodically. Reads only touch that table, so they answer in
+milliseconds regardless of how many entities are tracked.
+
+With ``snapshot_path`` set, every refresh also writes the table to a JSON
+file so other processes (one MCP server per assistant session) can serve it
+through ``SnapshotLeaderboard`` instead of each running their own refresher.
+"""
+
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+import json
+import os
+import threading
+import time
+
+from agents.ioda_agent import IODAAgent, build_ioda_agent
+from utils.lazy import optional_import
+from utils.signals import iter_series, summarize_series
+
+# ISO 3166-1 alpha-2 codes, which IODA uses as country entity codes
+COUNTRY_CODES = (
+    "AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ BA BB BD BE BF BG BH BI BJ BL BM BN BO BQ BR BS BT BV BW "
+    "BY BZ CA CC CD CF CG CH CI CK CL CM CN CO CR CU CV CW CX CY CZ DE DJ DK DM DO DZ EC EE EG EH ER ES ET FI "
+    "FJ FK FM FO FR GA GB GD GE GF GG GH GI GL GM GN GP GQ GR GS GT GU GW GY HK HM HN HR HT HU ID IE IL IM IN "
+    "IO IQ IR IS IT JE JM JO JP KE KG KH KI KM KN KP KR KW KY KZ LA LB LC LI LK LR LS LT LU LV LY MA MC MD ME "
+    "MF MG MH MK ML MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ NA NC NE NF NG NI NL NO NP NR NU NZ OM PA PE PF "
+    "PG PH PK PL PM PN PR PS PT PW PY QA RE RO RS RU RW SA SB SC SD SE SG SH SI SJ SK SL SM SN SO SR SS ST SV "
+    "SX SY SZ TC TD TF TG TH TJ TK TL TM TN TO TR TT TV TW TZ UA UG UM US UY UZ VA VC VE VG VI VN VU WF WS YE "
+    "YT ZA ZM ZW"
+).split()
+
+# Relative weight of each datasource in the combined score
+DATASOURCE_WEIGHTS = {"bgp": 1.0, "ping-slash24": 1.0, "merit-nt": 0.5}
+
+
+def _score_numpy(np, rows: List[List[Optional[float]]]) -> Dict[str, Any]:
+    """Score equal-datasource series in one pass over an entities x points matrix."""
+    width = max(len(r) for r in rows)
+    matrix = np.full((len(rows), width), np.nan)
+    for i, row in enumerate(rows):
+        # Compact series already hold NaN for missing points
+        matrix[i, :len(row)] = row if isinstance(row, array) else [np.nan if v is None else v for v in row]
+
+    observed = ~np.isnan(matrix)
+    has_data = observed.any(axis=1)
+    # Rows without any data become zeros (avoiding all-NaN warnings) and are marked unusable
+    filled = np.where(has_data[:, None], matrix, 0.0)
+    baseline = np.nanmedian(filled, axis=1)
+    lowest = np.nanmin(filled, axis=1)
+    # Last observed value per row: first observed column counting from the right
+    last_index = width - 1 - np.argmax(observed[:, ::-1], axis=1)
+    latest = filled[np.arange(len(rows)), last_index]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        current_drop = np.clip(1 - latest / baseline, 0, 1) * 100
+        max_drop = np.clip(1 - lowest / baseline, 0, 1) * 100
+    usable = has_data & (baseline > 0)
+    return {
+        "current_drop": np.where(usable, current_drop, 0.0).tolist(),
+        "max_drop": np.where(usable, max_drop, 0.0).tolist(),
+        "usable": usable.tolist(),
+    }
+
+
+def _score_python(rows: List[List[Optional[float]]]) -> Dict[str, Any]:
+    current, maximum, usable = [], [], []
+    for row in rows:
+        summary = summarize_series({"values": row})
+        ok = bool(summary and summary["baseline"] > 0)
+        usable.append(ok)
+        current.append(max(0.0, 100 - summary["latest_pct"]) if ok else 0.0)
+        maximum.append(max(0.0, summary["drop_pct"]) if ok else 0.0)
+    return {"current_drop": current, "max_drop": maximum, "usable": usable}
+
+
+def score_entities(signals: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rank entities by weighted current drop below their window baseline."""
+    by_datasource: Dict[str, Dict[str, List]] = {}
+    names: Dict[str, str] = {}
+    for code, data in signals.items():
+        for series in iter_series(data):
+            datasource = series.get("datasource") or "unknown"
+            bucket = by_datasource.setdefault(datasource, {"codes": [], "rows": []})
+            bucket["codes"].append(code)
+            bucket["rows"].append(series["values"])
+            names.setdefault(code, series.get("entityName") or code)
+
+    np = optional_import("numpy")
+    table: Dict[str, Dict[str, Any]] = {}
+    for datasource, bucket in by_datasource.items():
+        if not bucket["rows"]:
+            continue
+        scored = _score_numpy(np, bucket["rows"]) if np is not None else _score_python(bucket["rows"])
+        for code, current, maximum, ok in zip(bucket["codes"], scored["current_drop"], scored["max_drop"], scored["usable"]):
+            if not ok:
+                continue
+            entry = table.setdefault(code, {"entity": code, "name": names.get(code, code), "datasources": {}})
+            entry["datasources"][datasource] = {"current_drop_pct": round(current, 1), "max_drop_pct": round(maximum, 1)}
+
+    for entry in table.values():
+        weighted = [
+            (DATASOURCE_WEIGHTS.get(ds, 0.5), v["current_drop_pct"])
+            for ds, v in entry["datasources"].items()
+        ]
+        total_weight = sum(w for w, _ in weighted)
+        entry["score"] = round(sum(w * v for w, v in weighted) / total_weight, 1) if total_weight else 0.0
+
+    return sorted(table.values(), key=lambda e: e["score"], reverse=True)
+
+
+class OutageLeaderboard:
+    def __init__(
+        self,
+        ioda_agent: IODAAgent,
+        entity_codes: Optional[List[str]] = None,
+        window_hours: float = 6,
+        refresh_seconds: float = 300,
+        max_concurrency: int = 8,
+        snapshot_path: Optional[str] = None,
+    ):
+        self.ioda_agent = ioda_agent
+        self.snapshot_path = snapshot_path
+        self.entity_codes = list(entity_codes or COUNTRY_CODES)
+        self.window_hours = window_hours
+        self.refresh_seconds = refresh_seconds
+        self.max_concurrency = max_concurrency
+        self._table: List[Dict[str, Any]] = []
+        self._generated_at: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+
+    def refresh(self) -> None:
+        """Fetch all entities and rebuild the ranked table."""
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=self.window_hours)
+        signals = self.ioda_agent.fetch_bulk_signals(
+            self.entity_codes, start_time, end_time, max_concurrency=self.max_concurrency
+        )
+        table = score_entities(signals)
+        with self._lock:
+            # Keep the previous table if IODA could not be reached at all
+            if table or not self._table:
+                self._table = table
+                self._generated_at = end_time
+            table, generated_at = self._table, self._generated_at
+        if self.snapshot_path and generated_at:
+            write_snapshot(self.snapshot_path, {
+                "generated_at": generated_at.isoformat(),
+                "window_hours": self.window_hours,
+                "entities": len(self.entity_codes),
+                "table": table,
+            })
+        self._ready.set()
+
+    def start(self) -> None:
+        """Start the background refresh loop (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._loop, name="outage-leaderboard", daemon=True)
+            self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Leaderboard refresh failed: {e}")
+            time.sleep(self.refresh_seconds)
+
+    def top(self, limit: int = 20, min_score: float = 0.0, wait_seconds: float = 0) -> Dict[str, Any]:
+        """Serve the precomputed ranking; starts the refresher on first use.
+
+        Before the first refresh completes the result is empty with status
+        ``warming``, unless ``wait_seconds`` allows blocking until it is ready.
+        """
+        self.start()
+        if wait_seconds:
+            self._ready.wait(wait_seconds)
+        with self._lock:
+            table, generated_at = self._table, self._generated_at
+        items = [e for e in table if e["score"] >= min_score][:limit]
+        return {
+            "status": "ready" if generated_at else "warming",
+            "generated_at": generated_at.isoformat() if generated_at else None,
+            "window_hours": self.window_hours,
+            "entities": len(self.entity_codes),
+            "items": items,
+        }
+
+
+def write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    """Atomically replace the shared snapshot file."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SnapshotLeaderboard:
+    """Serves the ranking from the snapshot file another process keeps fresh.
+
+    Normally the API server's refresher writes the snapshot. If it is missing
+    or older than twice the refresh interval, this process refreshes it once
+    in the background; a lock file ensures only one process does so at a time,
+    and nothing keeps polling once the call returns.
+    """
+
+    def __init__(self, leaderboard: OutageLeaderboard, lock_timeout: float = 600):
+        if not leaderboard.snapshot_path:
+            raise ValueError("SnapshotLeaderboard needs a leaderboard with snapshot_path")
+        self.leaderboard = leaderboard
+        self.path = leaderboard.snapshot_path
+        self.lock_timeout = lock_timeout
+        self._thread: Optional[threading.Thread] = None
+
+    def top(self, limit: int = 20, min_score: float = 0.0) -> Dict[str, Any]:
+        snapshot = read_snapshot(self.path)
+        fresh = False
+        if snapshot:
+            age = (datetime.utcnow() - datetime.fromisoformat(snapshot["generated_at"])).total_seconds()
+            fresh = age <= 2 * self.leaderboard.refresh_seconds
+        if not fresh:
+            self._refresh_in_background()
+        if not snapshot:
+            return {
+                "status": "warming",
+                "generated_at": None,
+                "window_hours": self.leaderboard.window_hours,
+                "entities": len(self.leaderboard.entity_codes),
+                "items": [],
+            }
+        return {
+            "status": "ready" if fresh else "stale",
+            "generated_at": snapshot["generated_at"],
+            "window_hours": snapshot["window_hours"],
+            "entities": snapshot["entities"],
+            "items": [e for e in snapshot["table"] if e["score"] >= min_score][:limit],
+        }
+
+    def _refresh_in_background(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        lock_path = f"{self.path}.lock"
+        directory = os.path.dirname(lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < self.lock_timeout:
+                    return  # another process is refreshing
+                os.remove(lock_path)  # left behind by a process that died mid-refresh
+            except OSError:
+                pass
+            return
+        except OSError:
+            return
+
+        def run():
+            try:
+                self.leaderboard.refresh()
+            except Exception as e:
+                print(f"Leaderboard refresh failed: {e}")
+            finally:
+                try:
+                    os.remove(lock_path)
+                except OSError:
+                    pass
+
+        self._thread = threading.Thread(target=run, name="outage-leaderboard-snapshot", daemon=True)
+        self._thread.start()
+
+
+def build_leaderboard(config: dict) -> OutageLeaderboard:
+    return OutageLeaderboard(
+        build_ioda_agent(config),
+        entity_codes=config.get("leaderboard_entities"),
+        window_hours=float(config.get("leaderboard_window_hours", 6)),
+        refresh_seconds=float(config.get("leaderboard_refresh_seconds", 300)),
+        max_concurrency=int(config.get("leaderboard_max_concurrency", 8)),
+        snapshot_path=config.get("leaderboard_snapshot_path", "outputs/leaderboard.json") or None,
+    )
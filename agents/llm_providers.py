@@ -0,0 +1,779 @@
+"""LLM providers and a latency-aware router.
+
+Every provider exposes the same ``complete`` call, plus ``acomplete`` for
+callers running on an event loop. The router picks a provider per request
+from the input size and the latency it has observed so far, falls back to the
+next provider on errors or timeouts, and can hedge a slow request by racing a
+second provider. It also caps concurrent calls and backs off when a provider
+reports that a rate limit was hit.
+"""
+
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional, Tuple
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import weakref
+
+from utils.lazy import optional_import
+
+SYSTEM_PROMPT = "You are an expert network engineer specializing in internet outage analysis and incident response."
+
+GEMINI_OPENAI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta/openai/"
+
+# Routers are shared per provider configuration so latency observations
+# survive across requests (the server builds a Coordinator per request).
+# The model can come from the request body, so only the most recent are kept.
+_routers: "OrderedDict[str, ProviderRouter]" = OrderedDict()
+_routers_lock = threading.Lock()
+MAX_ROUTERS = 16
+
+# Concurrency limits are shared per set of credentials, whatever the model,
+# so switching models does not buy another llm_max_concurrency of calls
+_limiters: Dict[str, "CallLimiter"] = {}
+
+
+class ProviderError(RuntimeError):
+    """Raised when no provider could produce a completion."""
+
+
+class RateLimited(ProviderError):
+    """A provider rejected the call with HTTP 429; ``retry_after`` is in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Seconds in an OpenAI-style reset value such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    parts = _DURATION.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def retry_delay(headers: Mapping[str, str], default: float = 1.0) -> float:
+    """Seconds to wait before retrying, from rate-limit response headers."""
+    headers = {k.lower(): v for k, v in headers.items()}
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" in headers:
+        value = headers["retry-after"]
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [
+        _parse_duration(headers[name])
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if name in headers
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else default
+
+
+class LLMProvider:
+    """Base class for chat-completion backends."""
+
+    def __init__(self, name: str, model: str, timeout: float = 30.0, max_input_chars: Optional[int] = None):
+        self.name = name
+        self.model = model
+        self.timeout = timeout
+        # Inputs longer than this are routed to a larger provider
+        self.max_input_chars = max_input_chars
+        # Set from rate-limit headers: no calls before this time.monotonic() value
+        self.blocked_until = 0.0
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        raise NotImplementedError
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        """Async completion; providers without a native async client run ``complete`` in a thread."""
+        return await asyncio.to_thread(self.complete, prompt, temperature, max_tokens, image_base64)
+
+    @property
+    def credentials(self) -> str:
+        """Identifies the account this provider's calls count against."""
+        return f"{type(self).__name__}:{self.name}"
+
+    def block(self, seconds: float) -> None:
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def blocked_for(self) -> float:
+        return max(0.0, self.blocked_until - time.monotonic())
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any backend speaking the OpenAI chat-completions API (OpenAI, Gemini, Ollama, vLLM, ...)."""
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        api_key: Optional[str],
+        base_url: Optional[str] = None,
+        timeout: float = 30.0,
+        max_input_chars: Optional[int] = None,
+        supports_images: Optional[bool] = None,
+    ):
+        super().__init__(name, model, timeout, max_input_chars)
+        self.api_key = api_key
+        self.base_url = base_url
+        self.supports_images = "gpt-4" in model if supports_images is None else supports_images
+        self._client = None
+        # One async client (and so one connection pool) per event loop
+        self._async_clients: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def credentials(self) -> str:
+        key = hashlib.sha256((self.api_key or "").encode()).hexdigest()
+        return f"{self.base_url or 'openai'}:{key}"
+
+    def _new_client(self, class_name: str):
+        openai = optional_import("openai")
+        if openai is None:
+            raise ProviderError("openai package is not installed")
+        # Retries are the router's job, so the SDK should fail fast
+        return getattr(openai, class_name)(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            timeout=self.timeout,
+            max_retries=0,
+        )
+
+    @property
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                self._client = self._new_client("OpenAI")
+            return self._client
+
+    @property
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                client = self._async_clients[loop] = self._new_client("AsyncOpenAI")
+            return client
+
+    def _rate_limit_error(self, error: Exception) -> Optional[RateLimited]:
+        if getattr(error, "status_code", None) != 429:
+            return None
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = retry_delay(headers)
+        self.block(delay)
+        return RateLimited(f"rate limited, retry after {delay:g}s", delay)
+
+    def _note_rate_limits(self, headers: Mapping[str, str]) -> None:
+        """Pause this provider until reset once a rate-limit budget is used up."""
+        exhausted = any(
+            headers.get(f"x-ratelimit-remaining-{kind}") == "0" for kind in ("requests", "tokens")
+        )
+        if exhausted:
+            self.block(retry_delay(headers))
+
+    def build_messages(self, prompt: str, image_base64: Optional[str]) -> list:
+        content: list = [{"type": "text", "text": prompt}]
+        if image_base64 and self.supports_images:
+            content.append({
+                "type": "image_url",
+                "image_url": {"url": f"data:image/png;base64,{image_base64}"}
+            })
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": content},
+        ]
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        try:
+            raw = self.client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=self.build_messages(prompt, image_base64),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        except Exception as e:
+            limited = self._rate_limit_error(e)
+            if limited is None:
+                raise
+            raise limited from e
+        self._note_rate_limits(raw.headers)
+        return raw.parse().choices[0].message.content or "Report generation failed."
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        try:
+            raw = await self.async_client.chat.completions.with_raw_response.create(
+                model=self.model,
+                messages=self.build_messages(prompt, image_base64),
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+        except Exception as e:
+            limited = self._rate_limit_error(e)
+            if limited is None:
+                raise
+            raise limited from e
+        self._note_rate_limits(raw.headers)
+        return raw.parse().choices[0].message.content or "Report generation failed."
+
+
+class LocalProvider(LLMProvider):
+    """Offline stand-in that answers deterministically after a fixed delay.
+
+    Useful for exercising routing, fallback and hedging without network
+    access: ``latency_ms`` simulates a slow backend and ``fail`` an erroring
+    one.
+    """
+
+    def __init__(
+        self,
+        name: str = "local",
+        model: str = "local-standin",
+        latency_ms: float = 0,
+        fail: bool = False,
+        timeout: float = 30.0,
+        max_input_chars: Optional[int] = None,
+    ):
+        super().__init__(name, model, timeout, max_input_chars)
+        self.latency_ms = latency_ms
+        self.fail = fail
+
+    def complete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self._answer(prompt, image_base64)
+
+    async def acomplete(self, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str] = None) -> str:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        return self._answer(prompt, image_base64)
+
+    def _answer(self, prompt: str, image_base64: Optional[str]) -> str:
+        if self.fail:
+            raise ProviderError("simulated failure")
+        return (
+            f"## Report ({self.name})\n\n"
+            f"Local stand-in response for a {len(prompt)}-character prompt"
+            f"{' with image' if image_base64 else ''}."
+        )
+
+
+class CallLimiter:
+    """Concurrency cap shared by threads and event loops alike.
+
+    ``with limiter`` blocks the calling thread and ``async with limiter``
+    suspends the calling task; both draw on the same ``limit`` slots, handed
+    to waiters in arrival order.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, int(limit))
+        self.active = 0
+        self._lock = threading.Lock()
+        self._waiters: deque = deque()
+
+    def _try_acquire(self) -> bool:
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._try_acquire():
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        # release() hands the slot over without freeing it
+        event.wait()
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._try_acquire():
+                return
+            future = loop.create_future()
+            waiter = (loop, future)
+            self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = waiter in self._waiters
+                if queued:
+                    self._waiters.remove(waiter)
+            if not queued and future.done() and not future.cancelled():
+                # The slot was handed over just as the task was cancelled
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                loop, future = waiter
+                try:
+                    loop.call_soon_threadsafe(self._hand_over, future)
+                    return
+                except RuntimeError:
+                    # The waiter's loop is closed; pass the slot to the next one
+                    continue
+            self.active -= 1
+
+    def _hand_over(self, future: asyncio.Future) -> None:
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def __enter__(self) -> "CallLimiter":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    async def __aenter__(self) -> "CallLimiter":
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class _SyncCall:
+    """One ``_call`` in a worker thread, as seen by ``ProviderRouter.complete``.
+
+    ``started`` is set when the provider is actually called (after the slot
+    and any backoff), so queueing does not count against its timeout. Calls
+    racing for the same request share ``settled``, set once one of them has
+    answered, so the others are dropped before they reach a provider.
+    """
+
+    def __init__(self, provider: LLMProvider, changed: threading.Event, settled: threading.Event):
+        self.provider = provider
+        self.started: Optional[float] = None
+        self._changed = changed
+        self._settled = settled
+
+    @property
+    def abandoned(self) -> bool:
+        return self._settled.is_set()
+
+    def start(self) -> None:
+        self.started = time.monotonic()
+        self._changed.set()
+
+    def answered(self) -> None:
+        self._settled.set()
+
+    @property
+    def deadline(self) -> Optional[float]:
+        return None if self.started is None else self.started + self.provider.timeout
+
+
+class ProviderRouter:
+    """Route completions across providers by input size and observed latency.
+
+    Providers whose ``max_input_chars`` admits the input are tried smallest
+    tier first, and within a tier fastest first by an exponentially weighted
+    moving average of past latencies. Errors and timeouts fall through to the
+    next candidate. With ``hedge_after`` set, a request still running after
+    that many seconds is raced against the next candidate and the first
+    answer wins.
+
+    At most ``max_concurrency`` calls are in flight at once, counting
+    ``complete`` and ``acomplete`` callers together. A rate-limited call
+    is retried on the same provider after the delay its headers ask for, up
+    to ``rate_limit_retries`` times and ``max_backoff`` seconds per wait.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-router")
+
+    def __init__(
+        self,
+        providers: List[LLMProvider],
+        hedge_after: Optional[float] = None,
+        ewma_alpha: float = 0.3,
+        max_concurrency: int = 8,
+        rate_limit_retries: int = 2,
+        max_backoff: float = 20.0,
+        limiter: Optional[CallLimiter] = None,
+    ):
+        if not providers:
+            raise ValueError("ProviderRouter needs at least one provider")
+        self.providers = providers
+        self.hedge_after = hedge_after
+        self.ewma_alpha = ewma_alpha
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.rate_limit_retries = rate_limit_retries
+        self.max_backoff = max_backoff
+        self._latency: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._slots = limiter or CallLimiter(self.max_concurrency)
+
+    def observed_latency(self, provider: LLMProvider) -> Optional[float]:
+        with self._lock:
+            return self._latency.get(provider.name)
+
+    def record_latency(self, provider: LLMProvider, seconds: float) -> None:
+        with self._lock:
+            previous = self._latency.get(provider.name)
+            if previous is None:
+                self._latency[provider.name] = seconds
+            else:
+                self._latency[provider.name] = self.ewma_alpha * seconds + (1 - self.ewma_alpha) * previous
+
+    def candidates(self, input_chars: int) -> List[LLMProvider]:
+        """Providers able to take an input of this size, in preference order."""
+        eligible = [p for p in self.providers if p.max_input_chars is None or input_chars <= p.max_input_chars]
+        if not eligible:
+            # Nothing is large enough; the largest tier is the best we have
+            eligible = [max(self.providers, key=lambda p: p.max_input_chars or 0)]
+
+        def key(provider: LLMProvider) -> Tuple[float, float]:
+            tier = provider.max_input_chars if provider.max_input_chars is not None else float("inf")
+            latency = self.observed_latency(provider)
+            return (tier, latency if latency is not None else 0.0)
+
+        return sorted(eligible, key=key)
+
+    def _backoff(self, provider: LLMProvider, attempt: int) -> Optional[float]:
+        """Seconds to wait before calling ``provider``; None if it is blocked for too long."""
+        delay = provider.blocked_for()
+        if delay > self.max_backoff:
+            return None
+        # Jitter spreads out concurrent retries after a shared reset
+        return delay * (1 + random.random() * 0.2) if delay and attempt else delay
+
+    def _call(
+        self,
+        provider: LLMProvider,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        image_base64: Optional[str],
+        call: Optional[_SyncCall] = None,
+    ) -> str:
+        with self._slots:
+            for attempt in range(self.rate_limit_retries + 1):
+                delay = self._backoff(provider, attempt)
+                if delay is None:
+                    raise RateLimited(f"rate limited for {provider.blocked_for():.0f}s", provider.blocked_for())
+                if delay:
+                    time.sleep(delay)
+                if call is not None:
+                    if call.abandoned:
+                        # The caller already has an answer; don't spend a real completion
+                        raise ProviderError("abandoned before the call started")
+                    call.start()
+                started = time.monotonic()
+                try:
+                    result = provider.complete(prompt, temperature, max_tokens, image_base64)
+                except RateLimited:
+                    if attempt < self.rate_limit_retries:
+                        continue
+                    self.record_latency(provider, provider.timeout)
+                    raise
+                except Exception:
+                    # Failures count as a full timeout so the provider drops in preference
+                    self.record_latency(provider, provider.timeout)
+                    raise
+                self.record_latency(provider, time.monotonic() - started)
+                if call is not None:
+                    # Before the slot is released, so a hedge queued behind it never starts
+                    call.answered()
+                return result
+
+    async def _acall(self, provider: LLMProvider, prompt: str, temperature: float, max_tokens: int, image_base64: Optional[str]) -> str:
+        # The provider timeout starts once a slot is held, not while queueing for one
+        async with self._slots:
+            for attempt in range(self.rate_limit_retries + 1):
+                delay = self._backoff(provider, attempt)
+                if delay is None:
+                    raise RateLimited(f"rate limited for {provider.blocked_for():.0f}s", provider.blocked_for())
+                if delay:
+                    await asyncio.sleep(delay)
+                started = time.monotonic()
+                try:
+                    result = await asyncio.wait_for(
+                        provider.acomplete(prompt, temperature, max_tokens, image_base64), provider.timeout
+                    )
+                except RateLimited:
+                    if attempt < self.rate_limit_retries:
+                        continue
+                    self.record_latency(provider, provider.timeout)
+                    raise
+                except asyncio.TimeoutError:
+                    self.record_latency(provider, provider.timeout)
+                    raise ProviderError(f"timed out after {provider.timeout:g}s")
+                except Exception:
+                    self.record_latency(provider, provider.timeout)
+                    raise
+                self.record_latency(provider, time.monotonic() - started)
+                return result
+
+    def complete(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        image_base64: Optional[str] = None,
+    ) -> Tuple[str, LLMProvider]:
+        """Return ``(text, provider)`` from the first provider to succeed."""
+        queue = self.candidates(len(prompt))
+        pending: Dict = {}
+        errors: List[str] = []
+        hedged = False
+        # Set whenever a call starts or finishes, so the loop below can recompute deadlines
+        changed = threading.Event()
+        settled = threading.Event()
+
+        def launch() -> None:
+            call = _SyncCall(queue.pop(0), changed, settled)
+            future = self._executor.submit(self._call, call.provider, prompt, temperature, max_tokens, image_base64, call)
+            future.add_done_callback(lambda _: changed.set())
+            pending[future] = call
+
+        launch()
+        try:
+            while pending:
+                changed.clear()
+                for future in [f for f in pending if f.done()]:
+                    call = pending.pop(future)
+                    try:
+                        return future.result(), call.provider
+                    except Exception as e:
+                        errors.append(f"{call.provider.name}: {e}")
+
+                now = time.monotonic()
+                for future, call in list(pending.items()):
+                    if call.deadline is not None and now >= call.deadline:
+                        # The worker thread finishes on its own (clients carry the same timeout)
+                        pending.pop(future)
+                        self.record_latency(call.provider, call.provider.timeout)
+                        errors.append(f"{call.provider.name}: timed out after {call.provider.timeout:g}s")
+
+                if not pending:
+                    if not queue:
+                        break
+                    launch()
+                    continue
+                can_hedge = self.hedge_after is not None and not hedged and queue and len(pending) == 1
+                first = next(iter(pending.values()))
+                if can_hedge and first.started is not None and now - first.started >= self.hedge_after:
+                    hedged = True
+                    launch()
+                    continue
+
+                # Sleep until the next deadline or hedge point, or until a call starts or finishes
+                wake = [call.deadline for call in pending.values() if call.deadline is not None]
+                if can_hedge and first.started is not None:
+                    wake.append(first.started + self.hedge_after)
+                changed.wait(max(min(wake) - now, 0) if wake else None)
+        finally:
+            # Calls still queued for a slot are dropped rather than answered and thrown away
+            settled.set()
+            for future in pending:
+                future.cancel()
+
+        raise ProviderError("All LLM providers failed: " + "; ".join(errors))
+
+    async def acomplete(
+        self,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+        image_base64: Optional[str] = None,
+    ) -> Tuple[str, LLMProvider]:
+        """Async ``complete``: same routing, fallback and hedging, without holding a thread."""
+        queue = self.candidates(len(prompt))
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        errors: List[str] = []
+        hedged = False
+
+        def launch() -> None:
+            provider = queue.pop(0)
+            task = asyncio.ensure_future(self._acall(provider, prompt, temperature, max_tokens, image_base64))
+            pending[task] = provider
+
+        launch()
+        try:
+            while pending:
+                can_hedge = self.hedge_after is not None and not hedged and queue and len(pending) == 1
+                done, _ = await asyncio.wait(
+                    list(pending), timeout=self.hedge_after if can_hedge else None, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        return task.result(), provider
+                    except Exception as e:
+                        errors.append(f"{provider.name}: {e}")
+
+                if not done and can_hedge:
+                    hedged = True
+                    launch()
+                elif queue and not pending:
+                    launch()
+        finally:
+            # The losing side of a hedge is cancelled rather than left running
+            for task in pending:
+                task.cancel()
+
+        raise ProviderError("All LLM providers failed: " + "; ".join(errors))
+
+
+def build_provider(spec: dict, config: dict) -> LLMProvider:
+    """Create a provider from one ``llm_providers`` config entry."""
+    kind = spec.get("type", "openai")
+    name = spec.get("name") or kind
+    timeout = float(spec.get("timeout", 30))
+    max_input_chars = spec.get("max_input_chars")
+    max_input_chars = int(max_input_chars) if max_input_chars is not None else None
+
+    if kind == "local":
+        return LocalProvider(
+            name=name,
+            model=spec.get("model", "local-standin"),
+            latency_ms=float(spec.get("latency_ms", 0)),
+            fail=bool(spec.get("fail", False)),
+            timeout=timeout,
+            max_input_chars=max_input_chars,
+        )
+
+    if kind == "gemini":
+        from utils.config import get_geminiai_api_key
+
+        api_key = spec.get("api_key") or get_geminiai_api_key()
+        base_url = spec.get("base_url") or GEMINI_OPENAI_BASE_URL
+        model = spec.get("model", "gemini-2.0-flash")
+    elif kind == "openai":
+        api_key = spec.get("api_key") or os.getenv(spec.get("api_key_env", "OPENAI_API_KEY")) or config.get("openai_api_key")
+        base_url = spec.get("base_url")
+        model = spec.get("model") or config.get("openai_model", "gpt-4o-mini")
+        if not api_key and not base_url:
+            raise ValueError("no API key configured")
+    else:
+        raise ValueError(f"Unknown LLM provider type: {kind}")
+
+    return OpenAICompatibleProvider(
+        name=name,
+        model=model,
+        api_key=api_key or "not-needed",  # local OpenAI-compatible servers ignore the key
+        base_url=base_url,
+        timeout=timeout,
+        max_input_chars=max_input_chars,
+        supports_images=spec.get("supports_images"),
+    )
+
+
+def build_router(config: dict) -> Optional[ProviderRouter]:
+    """Return the router for ``llm_providers`` in the config, or None if not configured."""
+    specs = config.get("llm_providers") or []
+    if not specs:
+        return None
+    hedge_after = config.get("llm_hedge_after")
+    limits = limit_options(config)
+    cache_key = json.dumps([specs, hedge_after, config.get("openai_model"), limits], sort_keys=True, default=str)
+
+    with _routers_lock:
+        router = _cached_router(cache_key)
+        if router is not None:
+            return router
+
+        providers = []
+        for spec in specs:
+            try:
+                providers.append(build_provider(spec, config))
+            except Exception as e:
+                print(f"Warning: Skipping LLM provider {spec.get('name') or spec.get('type')}: {e}")
+        if not providers:
+            return None
+        router = ProviderRouter(
+            providers,
+            hedge_after=float(hedge_after) if hedge_after else None,
+            limiter=_shared_limiter(providers, limits["max_concurrency"]),
+            **limits,
+        )
+        _cache_router(cache_key, router)
+        return router
+
+
+def limit_options(config: dict) -> dict:
+    """ProviderRouter concurrency and rate-limit keyword arguments from the config."""
+    return {
+        "max_concurrency": int(config.get("llm_max_concurrency", 8)),
+        "rate_limit_retries": int(config.get("llm_rate_limit_retries", 2)),
+        "max_backoff": float(config.get("llm_max_backoff_seconds", 20)),
+    }
+
+
+def default_router(
+    model: str,
+    api_key: str,
+    max_concurrency: int = 8,
+    rate_limit_retries: int = 2,
+    max_backoff: float = 20.0,
+) -> ProviderRouter:
+    """Shared single-provider router for the plain ``openai_model`` setup."""
+    limits = {"max_concurrency": max_concurrency, "rate_limit_retries": rate_limit_retries, "max_backoff": max_backoff}
+    cache_key = json.dumps(
+        ["default", model, hashlib.sha256(api_key.encode()).hexdigest(), limits], sort_keys=True
+    )
+    with _routers_lock:
+        router = _cached_router(cache_key)
+        if router is None:
+            providers = [OpenAICompatibleProvider("openai", model, api_key, timeout=60.0)]
+            router = ProviderRouter(providers, limiter=_shared_limiter(providers, max_concurrency), **limits)
+            _cache_router(cache_key, router)
+        return router
+
+
+def _cached_router(cache_key: str) -> Optional[ProviderRouter]:
+    # Callers hold _routers_lock
+    router = _routers.get(cache_key)
+    if router is not None:
+        _routers.move_to_end(cache_key)
+    return router
+
+
+def _cache_router(cache_key: str, router: ProviderRouter) -> None:
+    _routers[cache_key] = router
+    while len(_routers) > MAX_ROUTERS:
+        _routers.popitem(last=False)
+
+
+def _shared_limiter(providers: List[LLMProvider], max_concurrency: int) -> CallLimiter:
+    # Callers hold _routers_lock; credentials and limits come from config, so this stays small
+    key = json.dumps([sorted({p.credentials for p in providers}), int(max_concurrency)])
+    limiter = _limiters.get(key)
+    if limiter is None:
+        limiter = _limiters[key] = CallLimiter(max_concurrency)
+    return limiter
@@ -6,10 +6,7 @@ Gracefully returns an empty list on failure or offline mode.
 from datetime import datetime
 from typing import List, Dict
 
-try:
-    import httpx
-except Exception:  # pragma: no cover - import safety
-    httpx = None  # type: ignore
+from utils.lazy import optional_import
 
 
 class NewsAgent:
@@ -19,7 +16,8 @@ class NewsAgent:
 
     def fetch_news(self, query: str, from_date: datetime, to_date: datetime) -> List[Dict]:
         """Fetch news articles related to the query within the specified date range."""
-        if not self.api_key or httpx is None:
+        httpx = optional_import("httpx") if self.api_key else None
+        if httpx is None:
             return []
 
         url = "https://newsapi.org/v2/everything"
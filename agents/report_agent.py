@@ -1,15 +1,17 @@
 """Report generation agent using OpenAI ChatGPT.
 
-Generates network outage analysis reports using GPT.
+Generates network outage analysis reports using GPT, or any set of providers
+routed through ``agents.llm_providers.ProviderRouter``.
 """
 
-from typing import Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
 import os
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None  # type: ignore
+from agents.llm_providers import ProviderRouter, default_router
+from agents.report_sections import SECTIONS, assemble_report, section_fingerprints, signal_lines
+from agents.template_report import render_template_report
 
 
 class ReportAgent:
@@ -21,6 +23,12 @@ class ReportAgent:
         model: str = "gpt-4o-mini",
         temperature: float = 0.7,
         max_tokens: int = 500,
+        router: Optional[ProviderRouter] = None,
+        mode: str = "llm",
+        series_points: int = 0,
+        max_concurrency: int = 8,
+        rate_limit_retries: int = 2,
+        max_backoff: float = 20.0,
     ):
         # Try to get API key from environment if not provided
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
@@ -29,21 +37,54 @@ class ReportAgent:
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        # "llm" uses the model when available; "fast" always uses the template engine
+        self.mode = mode
+        # Points per datasource in the signal trend given to the model (0 = summary only)
+        self.series_points = series_points
+        # Concurrent LLM calls allowed for the default OpenAI router (match the account's rate limits)
+        self.max_concurrency = max_concurrency
+        self.rate_limit_retries = rate_limit_retries
+        self.max_backoff = max_backoff
+        self.last_error: Optional[str] = None
 
-        # Initialize OpenAI client
-        self._client = None
-        if self.api_key and OpenAI is not None:
-            try:
-                self._client = OpenAI(api_key=self.api_key)
-            except Exception as e:
-                print(f"Warning: Could not initialize OpenAI client: {e}")
-                self._client = None
+        self.last_model: Optional[str] = None
 
-    def _create_prompt(self, location: str, news_articles: List[dict], visualization_url: Optional[str], has_image: bool) -> str:
-        """Create a prompt for GPT to generate a network outage report."""
-        prompt = f"""You are a network outage analysis expert. Generate a professional 300-word report analyzing a network outage incident.
+        # Without a configured router, the single OpenAI model is used; the
+        # openai package itself is only imported on the first completion
+        self._router = router
+
+    @property
+    def router(self) -> Optional[ProviderRouter]:
+        if self._router is None and self.api_key and self.use_llm:
+            # Shared across agents so connection pools and rate-limit state persist between requests
+            self._router = default_router(
+                self.model,
+                self.api_key,
+                max_concurrency=self.max_concurrency,
+                rate_limit_retries=self.rate_limit_retries,
+                max_backoff=self.max_backoff,
+            )
+        return self._router
 
-**LOCATION:** {location}
+    @property
+    def llm_enabled(self) -> bool:
+        """Whether reports would go through the LLM, without importing openai."""
+        if self.mode == "fast":
+            return False
+        return bool(self.use_llm and (self._router is not None or self.api_key))
+
+    @property
+    def model_label(self) -> str:
+        """Models that may answer, used to key cached reports."""
+        if not self.llm_enabled:
+            return "template"
+        if self._router is not None:
+            return ",".join(p.model for p in self._router.providers)
+        return self.model
+
+    def _create_context(self, location: str, news_articles: List[dict], visualization_url: Optional[str], has_image: bool) -> str:
+        """Describe the incident inputs (location, dashboard, image, news) for a prompt."""
+        prompt = f"""**LOCATION:** {location}
 **TIME WINDOW:** Last 24 hours
 """
         
@@ -69,6 +110,15 @@ class ReportAgent:
                 if description:
                     prompt += f"   Summary: {description}\n"
             prompt += "\n"
+
+        return prompt
+
+    def _create_prompt(self, location: str, news_articles: List[dict], visualization_url: Optional[str], has_image: bool) -> str:
+        """Create a prompt for GPT to generate a network outage report."""
+        prompt = """You are a network outage analysis expert. Generate a professional 300-word report analyzing a network outage incident.
+
+"""
+        prompt += self._create_context(location, news_articles, visualization_url, has_image)
         
         prompt += """**TASK:** Generate a comprehensive 300-word network outage analysis report.
 
@@ -93,7 +143,7 @@ Generate the report now:"""
 
     def generate_report(self, location: str, outage_data, news_articles, visualization_url: Optional[str] = None, image_base64: Optional[str] = None) -> str:
         """
-        Generates a 300-word report using OpenAI ChatGPT.
+        Generates a 300-word report using the configured LLM provider(s).
         
         Args:
             location: Geographic location being analyzed
@@ -102,9 +152,12 @@ Generate the report now:"""
             visualization_url: Link to IODA dashboard
             image_base64: User-uploaded image (PNG/JPEG)
         """
-        # Check if OpenAI is available
-        if not self._client:
-            return self._generate_demo_report(location, news_articles, has_image=bool(image_base64))
+        self.last_error = None
+        self.last_model = None
+
+        # Fast mode, or no LLM available: build the report from the data directly
+        if not self.llm_enabled:
+            return self.generate_fast_report(location, outage_data, news_articles, visualization_url, image_base64)
 
         # Create prompt with all inputs
         prompt = self._create_prompt(
@@ -114,60 +167,177 @@ Generate the report now:"""
             has_image=bool(image_base64)
         )
 
-        # Use OpenAI ChatGPT
+        # Route to the best available provider (images only reach vision-capable models)
         try:
-            content: Any = [{"type": "text", "text": prompt}]
-            
-            # Add image if provided (GPT-4 Vision models)
-            if image_base64 and "gpt-4" in self.model:
-                content.append({
-                    "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{image_base64}"}
-                })
-            
-            response = self._client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are an expert network engineer specializing in internet outage analysis and incident response."},
-                    {"role": "user", "content": content},
-                ],
+            report, provider = self.router.complete(
+                prompt,
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
+                image_base64=image_base64,
             )
-            return response.choices[0].message.content or "Report generation failed."
+            self.last_model = provider.model
+            return report
         except Exception as e:
-            error_msg = str(e)
-            print(f"OpenAI API error: {error_msg}")
-            return f"⚠️ OpenAI API Error: {error_msg}\n\nPlease configure your OPENAI_API_KEY in configs/config.yaml or as an environment variable."
-    
-    def _generate_demo_report(self, location: str, news_articles: List[dict], has_image: bool) -> str:
-        """Generate a simple demo report when OpenAI is not configured."""
-        report = f"""📊 Network Outage Analysis Report
-Location: {location}
-{"🖼️  Image: Outage visualization provided" if has_image else ""}
-
-⚠️ OpenAI API Configuration Required
-
-This system uses GPT (ChatGPT) to generate professional 300-word network outage analysis reports.
-
-To enable AI-powered reports:
-1. Get an API key from https://platform.openai.com/api-keys
-2. Add to configs/config.yaml: openai_api_key: "sk-your-key"
-3. Or set environment variable: export OPENAI_API_KEY="sk-your-key"
-
-Demo Mode Features:
-✓ Real-time IODA data integration
-✓ NewsAPI article aggregation  
-✓ Image upload support (PNG/JPEG)
-✓ GPT-4 powered analysis (when configured)
-
-With GPT enabled, you'll receive:
-• Executive summary of the outage
-• Root cause analysis
-• Impact assessment
-• Recommended remediation steps
-• Professional 300-word report
-
-{"News articles provided: " + str(len(news_articles)) if news_articles else ""}
+            return self._api_error(e)
+
+    async def agenerate_report(self, location: str, outage_data, news_articles, visualization_url: Optional[str] = None, image_base64: Optional[str] = None) -> str:
+        """Async counterpart of ``generate_report``: no thread is held while the model works.
+
+        CPU-bound work (template rendering, prompt building) runs in a worker
+        thread so it does not stall the event loop.
+        """
+        self.last_error = None
+        self.last_model = None
+
+        if not self.llm_enabled:
+            return await asyncio.to_thread(
+                self.generate_fast_report, location, outage_data, news_articles, visualization_url, image_base64
+            )
+
+        prompt = await asyncio.to_thread(
+            self._create_prompt, location, news_articles or [], visualization_url, bool(image_base64)
+        )
+        try:
+            report, provider = await self.router.acomplete(
+                prompt,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                image_base64=image_base64,
+            )
+            self.last_model = provider.model
+            return report
+        except Exception as e:
+            return self._api_error(e)
+
+    def _api_error(self, error: Exception) -> str:
+        error_msg = str(error)
+        self.last_error = error_msg
+        print(f"OpenAI API error: {error_msg}")
+        return f"⚠️ OpenAI API Error: {error_msg}\n\nPlease configure your OPENAI_API_KEY in configs/config.yaml or as an environment variable."
+
+    def _create_section_prompt(self, instruction: str, location: str, outage_data, news_articles: List[dict], visualization_url: Optional[str], has_image: bool) -> str:
+        """Create a prompt for one report section."""
+        prompt = """You are a network outage analysis expert writing one section of a network outage report.
+
 """
-        return report
+        prompt += self._create_context(location, news_articles, visualization_url, has_image)
+        prompt += f"""**IODA SIGNALS:**
+{signal_lines(outage_data, self.series_points)}
+
+**TASK:** {instruction}
+
+Be specific to {location}, use professional technical language, and do not repeat the section heading."""
+        return prompt
+
+    def generate_sections(
+        self,
+        location: str,
+        outage_data,
+        news_articles,
+        visualization_url: Optional[str] = None,
+        image_base64: Optional[str] = None,
+        previous: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> Tuple[str, Optional[Dict[str, Dict[str, str]]], List[str]]:
+        """
+        Generates the report section by section, reusing unchanged sections.
+
+        ``previous`` maps section keys to ``{"fingerprint", "text"}`` from an
+        earlier report; sections whose input fingerprint still matches are
+        reused verbatim. Returns ``(report, sections, regenerated_keys)``;
+        ``sections`` is None if generation failed.
+        """
+        fingerprints, sections, stale = self._plan_sections(location, outage_data, news_articles, image_base64, previous)
+
+        def generate(item):
+            key, instruction = item
+            prompt = self._create_section_prompt(
+                instruction, location, outage_data, news_articles or [], visualization_url, bool(image_base64)
+            )
+            return self.router.complete(
+                prompt,
+                temperature=self.temperature,
+                max_tokens=max(self.max_tokens // 2, 150),
+                image_base64=image_base64,
+            )
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(len(stale), 1)) as pool:
+                for (key, _), (text, provider) in zip(stale, pool.map(generate, stale)):
+                    sections[key] = {"fingerprint": fingerprints[key], "text": text}
+                    self.last_model = provider.model
+        except Exception as e:
+            return self._api_error(e), None, []
+
+        return assemble_report(location, sections), sections, [key for key, _ in stale]
+
+    async def agenerate_sections(
+        self,
+        location: str,
+        outage_data,
+        news_articles,
+        visualization_url: Optional[str] = None,
+        image_base64: Optional[str] = None,
+        previous: Optional[Dict[str, Dict[str, str]]] = None,
+    ) -> Tuple[str, Optional[Dict[str, Dict[str, str]]], List[str]]:
+        """Async counterpart of ``generate_sections``; stale sections are requested concurrently.
+
+        Section fingerprinting and prompt building run in a worker thread.
+        """
+        def plan():
+            fingerprints, sections, stale = self._plan_sections(
+                location, outage_data, news_articles, image_base64, previous
+            )
+            prompts = [
+                self._create_section_prompt(
+                    instruction, location, outage_data, news_articles or [], visualization_url, bool(image_base64)
+                )
+                for _, instruction in stale
+            ]
+            return fingerprints, sections, stale, prompts
+
+        fingerprints, sections, stale, prompts = await asyncio.to_thread(plan)
+
+        async def generate(prompt):
+            return await self.router.acomplete(
+                prompt,
+                temperature=self.temperature,
+                max_tokens=max(self.max_tokens // 2, 150),
+                image_base64=image_base64,
+            )
+
+        try:
+            results = await asyncio.gather(*(generate(prompt) for prompt in prompts))
+        except Exception as e:
+            return self._api_error(e), None, []
+        for (key, _), (text, provider) in zip(stale, results):
+            sections[key] = {"fingerprint": fingerprints[key], "text": text}
+            self.last_model = provider.model
+
+        return assemble_report(location, sections), sections, [key for key, _ in stale]
+
+    def _plan_sections(self, location, outage_data, news_articles, image_base64, previous):
+        """Fingerprint each section and split them into reusable and stale ones."""
+        self.last_error = None
+        self.last_model = None
+        previous = previous or {}
+        fingerprints = section_fingerprints(location, outage_data, news_articles, image_base64, model=self.model_label)
+
+        sections: Dict[str, Dict[str, str]] = {}
+        stale = []
+        for key, _, instruction in SECTIONS:
+            old = previous.get(key)
+            if old and old.get("fingerprint") == fingerprints[key]:
+                sections[key] = old
+            else:
+                stale.append((key, instruction))
+        return fingerprints, sections, stale
+
+    def generate_fast_report(self, location: str, outage_data, news_articles, visualization_url: Optional[str] = None, image_base64: Optional[str] = None) -> str:
+        """Deterministic template report from the IODA signals and news metadata (no LLM call)."""
+        return render_template_report(
+            location,
+            outage_data,
+            news_articles or [],
+            visualization_url=visualization_url,
+            has_image=bool(image_base64),
+        )
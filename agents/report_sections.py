@@ -0,0 +1,110 @@
+"""Section-level report generation support.
+
+A report is split into sections that are generated independently. Each
+section has a fingerprint over only the inputs it depends on, quantised so
+that small changes (a few more IODA points, a drop moving from 41% to 43%)
+do not count as material. On refresh, sections whose fingerprint is
+unchanged are reused from the previous report and only the rest are sent to
+the LLM again.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from agents.template_report import classify_severity
+from utils.downsample import downsample_series
+from utils.report_store import fingerprint_inputs
+from utils.signals import iter_series, summarize_outage_data, summarize_series
+
+# (key, heading, instruction)
+SECTIONS = [
+    ("summary", "Executive Summary",
+     "Write the Executive Summary (about 80 words): what happened in this location, synthesizing the IODA signals, news and image."),
+    ("root_cause", "Root Cause Analysis",
+     "Write the Root Cause Analysis (about 80 words): list the 3-4 most likely technical causes based on the evidence."),
+    ("impact", "Impact Assessment",
+     "Write the Impact Assessment (about 70 words): who is affected - infrastructure, businesses, citizens."),
+    ("actions", "Recommended Actions",
+     "Write the Recommended Actions (about 70 words): 4 specific technical steps for ISPs/engineers."),
+]
+
+
+def _bucket(value: float, size: float = 10.0) -> int:
+    return int(value // size)
+
+
+def signal_features(outage_data: Any) -> List[Dict[str, Any]]:
+    """Quantised view of the signals: what a reader would call a material change."""
+    return sorted(
+        (
+            {
+                "datasource": s["datasource"],
+                "drop": _bucket(s["drop_pct"]),
+                # Current level only matters once it crosses a severity class
+                "latest": classify_severity(100 - s["latest_pct"]),
+                "dips": len(s["dips"]),
+            }
+            for s in summarize_outage_data(outage_data)
+        ),
+        key=lambda f: f["datasource"],
+    )
+
+
+def news_features(news_articles: Optional[List[dict]]) -> List[str]:
+    return sorted((a.get("url") or a.get("title") or "") for a in (news_articles or [])[:5])
+
+
+def section_fingerprints(
+    location: str,
+    outage_data: Any,
+    news_articles: Optional[List[dict]],
+    image_base64: Optional[str] = None,
+    model: Optional[str] = None,
+) -> Dict[str, str]:
+    """Fingerprint of each section's material inputs (and the model that writes it)."""
+    signals = signal_features(outage_data)
+    news = news_features(news_articles)
+    image = fingerprint_inputs(image=image_base64) if image_base64 else None
+    severity = [(f["datasource"], f["drop"]) for f in signals]
+
+    root_cause = fingerprint_inputs(section="root_cause", model=model, severity=severity, news=news, image=image)
+    return {
+        "summary": fingerprint_inputs(section="summary", model=model, location=location, signals=signals, news=news, image=image),
+        "root_cause": root_cause,
+        "impact": fingerprint_inputs(section="impact", model=model, location=location, signals=signals),
+        # Actions follow from the causes, so they change when root_cause does
+        "actions": fingerprint_inputs(section="actions", model=model, location=location, root_cause=root_cause),
+    }
+
+
+def signal_lines(outage_data: Any, trend_points: int = 0) -> str:
+    """IODA signal summary for inclusion in a prompt.
+
+    With ``trend_points`` each datasource also gets its series downsampled to
+    that many points, as percentages of baseline, so the model sees the shape
+    of the outage and not only its extremes.
+    """
+    rows = []
+    for series in iter_series(outage_data):
+        summary = summarize_series(series)
+        if summary:
+            rows.append((summary, series))
+    rows.sort(key=lambda row: row[0]["drop_pct"], reverse=True)
+    lines = []
+    for s, series in rows:
+        line = (
+            f"- {s['datasource']}: lowest {s['drop_pct']:.0f}% below baseline, "
+            f"latest {s['latest_pct']:.0f}% of baseline, {len(s['dips'])} dip(s)"
+        )
+        if trend_points and s["baseline"] > 0:
+            trend = downsample_series(series, trend_points, "minmax")["values"]
+            line += "\n  trend (% of baseline, oldest first): " + " ".join(f"{v / s['baseline'] * 100:.0f}" for v in trend)
+        lines.append(line)
+    return "\n".join(lines) or "- No IODA signal data available"
+
+
+def assemble_report(location: str, sections: Dict[str, Dict[str, str]]) -> str:
+    parts = [f"# Network Outage Report: {location}"]
+    for key, heading, _ in SECTIONS:
+        if key in sections:
+            parts.append(f"## {heading}\n\n{sections[key]['text'].strip()}")
+    return "\n\n".join(parts) + "\n"
@@ -0,0 +1,140 @@
+"""Deterministic template-based outage reports.
+
+Builds the executive summary, impact and timeline sections straight from
+IODA signal summaries and news metadata, without any LLM call. Rendering
+takes well under a millisecond for typical windows, so it serves both as an
+explicit fast mode and as an instant first answer while an LLM report is
+still being generated.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from utils.signals import summarize_outage_data
+
+# Drop thresholds (percent below baseline) for each severity label
+SEVERITY_LEVELS = [
+    (50.0, "severe"),
+    (20.0, "significant"),
+    (5.0, "minor"),
+]
+
+DATASOURCE_LABELS = {
+    "bgp": "BGP routing (announced prefixes)",
+    "ping-slash24": "Active probing (responsive /24 blocks)",
+    "merit-nt": "Internet telescope (unsolicited traffic)",
+    "gtr": "Google Transparency Report traffic",
+}
+
+
+def classify_severity(drop_pct: float) -> str:
+    for threshold, label in SEVERITY_LEVELS:
+        if drop_pct >= threshold:
+            return label
+    return "none"
+
+
+def _format_ts(ts: Optional[int]) -> str:
+    if ts is None:
+        return "unknown time"
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
+
+
+def _label(datasource: str) -> str:
+    return DATASOURCE_LABELS.get(datasource, datasource)
+
+
+def executive_summary(location: str, signals: List[Dict[str, Any]], news_articles: List[dict], has_image: bool) -> str:
+    if not signals:
+        text = (
+            f"No IODA signal data was available for {location} in this window, so connectivity "
+            "could not be assessed from measurements."
+        )
+    else:
+        worst = signals[0]
+        severity = classify_severity(worst["drop_pct"])
+        if severity == "none":
+            text = (
+                f"IODA signals for {location} show no significant disruption: every datasource stayed "
+                f"within {worst['drop_pct']:.0f}% of its baseline."
+            )
+        else:
+            affected = [s for s in signals if classify_severity(s["drop_pct"]) != "none"]
+            text = (
+                f"IODA signals for {location} indicate a {severity} disruption. "
+                f"{_label(worst['datasource'])} fell {worst['drop_pct']:.0f}% below its baseline, "
+                f"with {len(affected)} of {len(signals)} datasources affected. "
+                f"It currently stands at {worst['latest_pct']:.0f}% of baseline."
+            )
+    if news_articles:
+        text += f" {len(news_articles)} related news article(s) were found for context."
+    if has_image:
+        text += " A user-supplied outage visualization accompanies this report."
+    return text
+
+
+def impact_assessment(signals: List[Dict[str, Any]]) -> str:
+    if not signals:
+        return "- Impact unknown: no measurements available."
+    lines = []
+    for s in signals:
+        severity = classify_severity(s["drop_pct"])
+        lines.append(
+            f"- **{_label(s['datasource'])}**: lowest {s['drop_pct']:.0f}% below baseline, "
+            f"now {s['latest_pct']:.0f}% of baseline ({severity if severity != 'none' else 'normal'})"
+        )
+    worst = classify_severity(signals[0]["drop_pct"])
+    if worst in ("severe", "significant"):
+        lines.append("- Households, businesses and public services relying on affected networks are likely disrupted.")
+    return "\n".join(lines)
+
+
+def timeline(signals: List[Dict[str, Any]]) -> str:
+    events = []
+    for s in signals:
+        for dip in s["dips"]:
+            events.append((dip["start"] or 0, dip, s["datasource"]))
+    if not events:
+        return "- No dips below 80% of baseline were observed."
+    events.sort(key=lambda e: e[0])
+    return "\n".join(
+        f"- {_format_ts(dip['start'])} → {_format_ts(dip['end'])}: "
+        f"{_label(datasource)} down {dip['depth_pct']:.0f}%"
+        for _, dip, datasource in events[:10]
+    )
+
+
+def news_sources(news_articles: List[dict]) -> str:
+    lines = []
+    for article in news_articles[:5]:
+        title = article.get("title") or "Untitled"
+        source = (article.get("source") or {}).get("name") if isinstance(article.get("source"), dict) else article.get("source")
+        lines.append(f"- {title}" + (f" ({source})" if source else ""))
+    return "\n".join(lines)
+
+
+def render_template_report(
+    location: str,
+    outage_data: Any,
+    news_articles: Optional[List[dict]] = None,
+    visualization_url: Optional[str] = None,
+    has_image: bool = False,
+) -> str:
+    """Render a markdown report from structured inputs only."""
+    news_articles = news_articles or []
+    signals = summarize_outage_data(outage_data)
+
+    parts = [
+        f"# Network Outage Report: {location}",
+        "## Executive Summary",
+        executive_summary(location, signals, news_articles, has_image),
+        "## Impact Assessment",
+        impact_assessment(signals),
+        "## Timeline",
+        timeline(signals),
+    ]
+    if news_articles:
+        parts += ["## News Coverage", news_sources(news_articles)]
+    if visualization_url:
+        parts += ["## IODA Dashboard", visualization_url]
+    return "\n\n".join(parts) + "\n"
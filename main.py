@@ -1,39 +1,38 @@
 # main.py
 
-import os
+import argparse
+import json
 from pathlib import Path
-import yaml
 from datetime import datetime, timedelta
 from agents.coordinator import Coordinator
 
-# Load environment variables from .env file
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass
-
-def load_config(config_path):
-    """Load config from YAML and override with environment variables."""
-    with open(config_path, 'r') as file:
-        config = yaml.safe_load(file)
-    
-    # Override with environment variables if they exist
-    if os.getenv("OPENAI_API_KEY"):
-        config["openai_api_key"] = os.getenv("OPENAI_API_KEY")
-    if os.getenv("NEWSAPI_KEY"):
-        config["news_api_key"] = os.getenv("NEWSAPI_KEY")
-    
-    return config
-
-def load_prompt(prompt_path):
-    with open(prompt_path, 'r') as file:
-        return file.read()
-
-def main():
-    config = load_config("configs/config.yaml")
-    prompt_template = load_prompt("configs/prompts/report_prompt.txt")
+# Importing utils.config loads environment variables from the .env file
+from utils.config import load_config, load_prompt
+from utils.signals import json_default
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Network outage analyzer CLI")
+    subparsers = parser.add_subparsers(dest="command")
+
+    subparsers.add_parser("report", help="Generate an outage report (default)")
+
+    backfill = subparsers.add_parser("backfill", help="Fetch a long IODA range in parallel chunks")
+    backfill.add_argument("--location", help="Location to fetch (defaults to default_location)")
+    backfill.add_argument("--days", type=float, default=7, help="Days to look back from --end (default: 7)")
+    backfill.add_argument("--end", help="ISO end time in UTC (default: now)")
+    backfill.add_argument("--chunk-hours", type=float, default=None, help="Chunk size in hours (default: ioda_chunk_hours or 24)")
+    backfill.add_argument("--concurrency", type=int, default=None, help="Max chunks in flight")
+    backfill.add_argument("--retries", type=int, default=None, help="Retries per failed chunk")
+    backfill.add_argument("--output", help="Output JSON path (default: outputs/backfill/...)")
+
+    profile = subparsers.add_parser("profile-startup", help="Report import time per module for the entry points")
+    profile.add_argument("modules", nargs="*", help="Modules to import (default: main, server.app, mcp_server)")
+    profile.add_argument("--top", type=int, default=15, help="Number of slowest modules to list (default: 15)")
+
+    return parser.parse_args(argv)
 
+
+def run_report(config, prompt_template):
     coordinator = Coordinator(config, prompt_template)
 
     # Example parameters (could be parameterized later)
@@ -54,5 +53,61 @@ def main():
 
     print(f"Report saved to {output_path}")
 
+
+def run_backfill(config, args):
+    if args.concurrency is not None:
+        config["ioda_max_concurrency"] = args.concurrency
+    if args.retries is not None:
+        config["ioda_chunk_retries"] = args.retries
+    coordinator = Coordinator(config, "")
+
+    location = args.location or config.get("default_location", "Sanaa, Yemen")
+    end_time = datetime.fromisoformat(args.end) if args.end else datetime.utcnow()
+    start_time = end_time - timedelta(days=args.days)
+    chunk_hours = args.chunk_hours or float(config.get("ioda_chunk_hours", 24))
+
+    outage_data = coordinator.fetch_outage_data(location, start_time, end_time, chunk_hours=chunk_hours)
+    if outage_data is None:
+        print("Backfill failed: no chunks could be fetched from IODA")
+        return 1
+
+    output_path = Path(args.output) if args.output else Path("outputs/backfill") / (
+        f"backfill_{location.replace(', ', '_')}_{start_time.strftime('%Y%m%d%H%M%S')}"
+        f"_{end_time.strftime('%Y%m%d%H%M%S')}.json"
+    )
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, 'w') as file:
+        json.dump(outage_data, file, default=json_default)
+
+    failed = (outage_data.get("backfill") or {}).get("failed") or []
+    if failed:
+        print(f"Warning: {len(failed)} chunk(s) could not be fetched")
+    print(f"Backfill saved to {output_path}")
+    return 0
+
+
+def run_profile_startup(args):
+    from utils.startup_profile import DEFAULT_TARGETS, format_profile, profile_import
+
+    for module in args.modules or DEFAULT_TARGETS:
+        print(format_profile(profile_import(module), top=args.top))
+        print()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "profile-startup":
+        return run_profile_startup(args)
+
+    config = load_config("configs/config.yaml")
+
+    if args.command == "backfill":
+        return run_backfill(config, args)
+
+    prompt_template = load_prompt("configs/prompts/report_prompt.txt")
+    run_report(config, prompt_template)
+    return 0
+
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
@@ -26,8 +26,8 @@ if sys.version_info < (3, 10):
 import asyncio
 import json
 from datetime import datetime, timedelta
-from typing import Any, Optional
-import yaml
+from functools import lru_cache
+from typing import Any, Optional, Union
 
 try:
     from mcp.server import Server
@@ -39,12 +39,18 @@ except ImportError:
     print("   (Requires Python 3.10+)")
     sys.exit(1)
 
-from agents.ioda_agent import IODAAgent
+from agents.ioda_agent import IODAAgent, build_ioda_agent
+from agents.leaderboard import OutageLeaderboard, SnapshotLeaderboard, build_leaderboard
 from agents.news_agent import NewsAgent
+from utils.downsample import SeriesCache
+from utils.profiling import ProfileStore, RequestProfile, profiled, sampled
+from utils.signals import json_default
 
 
 def load_config(config_path: str = "configs/config.yaml") -> dict:
     """Load configuration from YAML file."""
+    import yaml
+
     with open(config_path, 'r') as file:
         return yaml.safe_load(file)
 
@@ -52,10 +58,64 @@ def load_config(config_path: str = "configs/config.yaml") -> dict:
 # Initialize the MCP server
 app = Server("outage-analyzer")
 
-# Load config and initialize agents
-config = load_config()
-ioda_agent = IODAAgent(config.get("ioda_base_url"))
-news_agent = NewsAgent(config.get("news_api_key"))
+
+# Config and agents are built on the first tool call, not at import, so the
+# server answers the client's initialize handshake as early as possible
+@lru_cache(maxsize=1)
+def get_config() -> dict:
+    return load_config()
+
+
+def dump_json(data: Any) -> str:
+    """Compact JSON for tool results; compact IODA series are written as plain lists."""
+    return json.dumps(data, separators=(",", ":"), default=json_default)
+
+
+@lru_cache(maxsize=1)
+def get_ioda_agent() -> IODAAgent:
+    return build_ioda_agent(get_config())
+
+
+@lru_cache(maxsize=1)
+def get_series_cache() -> SeriesCache:
+    return SeriesCache(
+        get_ioda_agent().fetch_outage_data,
+        bucket_seconds=int(get_config().get("series_cache_seconds", 300)),
+    )
+
+
+def fetch_outage_data(location: str, window_hours: float, points: Optional[int], start_time: datetime, end_time: datetime):
+    """Full-resolution data, or a cached downsampled view when ``points`` is given."""
+    if points:
+        return get_series_cache().get(location, window_hours, int(points))[0]
+    return get_ioda_agent().fetch_outage_data(location, start_time, end_time)
+
+
+@lru_cache(maxsize=1)
+def get_news_agent() -> NewsAgent:
+    return NewsAgent(get_config().get("news_api_key"))
+
+
+@lru_cache(maxsize=1)
+def get_leaderboard() -> Union[SnapshotLeaderboard, OutageLeaderboard]:
+    # Served from the snapshot the API server keeps fresh, rather than a
+    # refresher per assistant session
+    leaderboard = build_leaderboard(get_config())
+    return SnapshotLeaderboard(leaderboard) if leaderboard.snapshot_path else leaderboard
+
+
+@lru_cache(maxsize=1)
+def get_profile_store() -> Optional[ProfileStore]:
+    config = get_config()
+    path = config.get("profile_store_path", "outputs/profiles.db")
+    return ProfileStore(path, max_rows=int(config.get("profile_max_rows", 500))) if path else None
+
+
+PROFILE_ARGUMENT = {
+    "type": "boolean",
+    "description": "Optional: record a cProfile of this call (listed under /admin/profiles)",
+    "default": False
+}
 
 
 @app.list_tools()
@@ -80,7 +140,15 @@ async def list_tools() -> list[Tool]:
                         "type": "number",
                         "description": "Time window in hours to look back from now",
                         "default": 4
-                    }
+                    },
+                    "points": {
+                        "type": "number",
+                        "description": (
+                            "Optional: downsample each signal series to about this many points "
+                            "(outage dips are preserved). Omit for full resolution."
+                        )
+                    },
+                    "profile": PROFILE_ARGUMENT
                 },
                 "required": ["location"]
             }
@@ -148,17 +216,89 @@ async def list_tools() -> list[Tool]:
                         "type": "number",
                         "description": "Time window in hours to look back from now",
                         "default": 4
-                    }
+                    },
+                    "points": {
+                        "type": "number",
+                        "description": (
+                            "Optional: downsample each signal series to about this many points "
+                            "(outage dips are preserved). Omit for full resolution."
+                        )
+                    },
+                    "profile": PROFILE_ARGUMENT
                 },
                 "required": ["location"]
             }
+        ),
+        Tool(
+            name="top_outages",
+            description=(
+                "List the locations (countries by default) with the worst internet outages right now, "
+                "ranked by how far their IODA signals have dropped below baseline. "
+                "Use this to find where outages are happening before analyzing a specific location."
+            ),
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of entities to return",
+                        "default": 10
+                    },
+                    "min_score": {
+                        "type": "number",
+                        "description": "Only include entities with at least this outage score (0-100)",
+                        "default": 0
+                    }
+                }
+            }
         )
     ]
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
-    """Handle tool execution."""
+    """Handle tool execution, profiling it when asked to or when sampled."""
+    arguments = arguments or {}
+    profile = None
+    if get_config().get("profile_store_path", "outputs/profiles.db"):
+        if arguments.get("profile"):
+            trigger = "argument"
+        elif sampled(float(get_config().get("profile_sample_percent", 0))):
+            trigger = "sample"
+        else:
+            trigger = None
+        if trigger:
+            metadata = {k: v for k, v in arguments.items() if k != "profile"}
+            profile = RequestProfile("mcp", name, trigger, metadata=metadata)
+
+    result = await run_tool(name, arguments, profile)
+    if profile is not None:
+        failed = result[0].text.startswith("Error executing")
+        profile_id = await asyncio.to_thread(get_profile_store().save, profile, 500 if failed else 200)
+        if profile.trigger == "argument":
+            result.append(TextContent(type="text", text=f"profile_id: {profile_id}"))
+    return result
+
+
+async def run_tool(name: str, arguments: Any, profile: Optional[RequestProfile]) -> list[TextContent]:
+    if name == "top_outages":
+        try:
+            leaderboard = await asyncio.to_thread(
+                profiled(profile, get_leaderboard().top),
+                limit=int(arguments.get("limit", 10)),
+                min_score=float(arguments.get("min_score", 0)),
+            )
+        except Exception as e:
+            return [TextContent(type="text", text=f"Error executing {name}: {str(e)}")]
+        return [TextContent(
+            type="text",
+            text=dump_json(leaderboard)
+        )]
+    return profiled(profile, execute_tool)(name, arguments)
+
+
+def execute_tool(name: str, arguments: Any) -> list[TextContent]:
+    """Run one of the data tools."""
     
     location = arguments.get("location", "")
     window_hours = arguments.get("window_hours", 4)
@@ -168,18 +308,21 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     start_time = end_time - timedelta(hours=window_hours)
     
     try:
+        ioda_agent = get_ioda_agent()
+        news_agent = get_news_agent()
+
         if name == "fetch_outage_data":
-            outage_data = ioda_agent.fetch_outage_data(location, start_time, end_time)
+            outage_data = fetch_outage_data(location, window_hours, arguments.get("points"), start_time, end_time)
             return [TextContent(
                 type="text",
-                text=json.dumps(outage_data, indent=2, default=str)
+                text=dump_json(outage_data)
             )]
         
         elif name == "fetch_news":
             news_articles = news_agent.fetch_news(location, start_time, end_time)
             return [TextContent(
                 type="text",
-                text=json.dumps(news_articles, indent=2, default=str)
+                text=dump_json(news_articles)
             )]
         
         elif name == "get_visualization_url":
@@ -191,7 +334,7 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
         
         elif name == "analyze_outage":
             # Comprehensive analysis
-            outage_data = ioda_agent.fetch_outage_data(location, start_time, end_time)
+            outage_data = fetch_outage_data(location, window_hours, arguments.get("points"), start_time, end_time)
             news_articles = news_agent.fetch_news(location, start_time, end_time)
             viz_url = ioda_agent.get_visualization_url(location, start_time, end_time)
             
@@ -209,7 +352,7 @@ async def call_tool(name: str, arguments: Any) -> list[TextContent]:
             
             return [TextContent(
                 type="text",
-                text=json.dumps(analysis, indent=2, default=str)
+                text=dump_json(analysis)
             )]
         
         else:
@@ -0,0 +1,217 @@
+"""Admission control and load shedding for the API.
+
+Requests are admitted through lanes, each with its own concurrency limit and
+a bounded FIFO wait queue:
+
+- ``generate``: live report generation (IODA + NewsAPI + LLM), the expensive lane
+- ``fetch``: endpoints that may call upstream APIs (``/news``, ``/series``)
+- ``read``: answers served from the report store, the leaderboard table or config
+
+A client may hold only ``per_client`` slots of a lane at once (429 beyond
+that). When a lane and its queue are full, or a queued request waits past
+the deadline, the request is rejected immediately with 503 and a
+``Retry-After`` estimated from recent service times, instead of piling onto
+the threadpool. Lanes are independent, so shedding generation never blocks
+cheap reads, and ``/health`` is not gated at all.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, Dict, FrozenSet, Optional
+
+from fastapi import HTTPException, Request
+
+
+class Overloaded(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Lane:
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float, per_client: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self.per_client = per_client
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._clients: Dict[str, int] = {}
+        # Smoothed seconds per request, for Retry-After estimates
+        self.service_seconds = 1.0
+        self.shed = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued work spread over the lane's slots."""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self.service_seconds * backlog / self.concurrency))
+
+    def _reject(self, status_code: int, detail: str) -> Overloaded:
+        self.shed += 1
+        return Overloaded(status_code, detail, self.retry_after())
+
+    def _hold(self, client: str, delta: int) -> None:
+        held = self._clients.get(client, 0) + delta
+        if held > 0:
+            self._clients[client] = held
+        else:
+            self._clients.pop(client, None)
+
+    async def acquire(self, client: str) -> None:
+        if self.per_client and self._clients.get(client, 0) >= self.per_client:
+            raise self._reject(429, f"Too many concurrent {self.name} requests from this client")
+
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+        else:
+            if len(self._waiters) >= self.queue_size:
+                raise self._reject(503, f"Server is saturated ({self.name} queue full)")
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            self._hold(client, 1)  # queued requests count against the client too
+            try:
+                await asyncio.wait({waiter}, timeout=self.queue_timeout)
+            except BaseException:
+                # Client went away while queued
+                self._hold(client, -1)
+                self._abandon(waiter)
+                raise
+            self._hold(client, -1)
+            if not waiter.done():
+                self._abandon(waiter)
+                raise self._reject(503, f"Timed out waiting for a {self.name} slot")
+            # The releasing request handed its slot over; active is unchanged
+        self._hold(client, 1)
+
+    def _abandon(self, waiter: asyncio.Future) -> None:
+        if waiter.done() and not waiter.cancelled():
+            # A slot was handed over just as we gave up: pass it on
+            self._hand_off()
+        else:
+            self._waiters.remove(waiter)
+            waiter.cancel()
+
+    def release(self, client: str, elapsed: float) -> None:
+        self.service_seconds = 0.8 * self.service_seconds + 0.2 * elapsed
+        self._hold(client, -1)
+        self._hand_off()
+
+    def _hand_off(self) -> None:
+        """Give the slot to the oldest waiter, or free it."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "queue_size": self.queue_size,
+            "shed": self.shed,
+            "service_seconds": round(self.service_seconds, 3),
+        }
+
+
+class Ticket:
+    """Outcome of admission for endpoints that can degrade instead of failing."""
+
+    __slots__ = ("admitted", "status_code", "detail", "retry_after")
+
+    def __init__(self, admitted: bool, status_code: int = 200, detail: str = "", retry_after: int = 0):
+        self.admitted = admitted
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def client_key(request: Request, trusted_proxies: FrozenSet[str] = frozenset()) -> str:
+    """The caller's address, for per-client limits.
+
+    ``X-Forwarded-For`` is only believed when the direct peer is a trusted
+    proxy; the client is then the right-most hop that is not itself trusted.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if peer not in trusted_proxies:
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if hop not in trusted_proxies:
+            return hop
+    return hops[0] if hops else peer
+
+
+class AdmissionController:
+    """Lanes are built from config on first use, so importing the app stays cheap."""
+
+    def __init__(self, load_config: Callable[[], dict]):
+        self._load_config = load_config
+        self._lanes: Optional[Dict[str, Lane]] = None
+        self._trusted_proxies: FrozenSet[str] = frozenset()
+
+    @property
+    def lanes(self) -> Dict[str, Lane]:
+        if self._lanes is None:
+            config = self._load_config()
+            self._trusted_proxies = frozenset(config.get("trusted_proxies") or ())
+            self._lanes = build_lanes(config)
+        return self._lanes
+
+    @property
+    def trusted_proxies(self) -> FrozenSet[str]:
+        self.lanes  # loads the config on first use
+        return self._trusted_proxies
+
+    def slot(self, lane_name: str, degrade: bool = False) -> Callable[[Request], AsyncIterator[Ticket]]:
+        """FastAPI dependency holding a slot of ``lane_name`` for the request.
+
+        Rejections raise 429/503 with ``Retry-After``; with ``degrade=True``
+        the endpoint instead receives a non-admitted ``Ticket`` and can serve
+        a cheaper answer.
+        """
+        async def dependency(request: Request) -> AsyncIterator[Ticket]:
+            lane = self.lanes[lane_name]
+            client = client_key(request, self.trusted_proxies)
+            try:
+                await lane.acquire(client)
+            except Overloaded as e:
+                if not degrade:
+                    raise HTTPException(
+                        status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)}
+                    )
+                yield Ticket(False, e.status_code, e.detail, e.retry_after)
+                return
+            started = time.monotonic()
+            try:
+                yield Ticket(True)
+            finally:
+                lane.release(client, time.monotonic() - started)
+        return dependency
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: lane.stats() for name, lane in self.lanes.items()}
+
+
+def build_lanes(config: dict) -> Dict[str, Lane]:
+    queue_size = int(config.get("admission_queue_size", 16))
+    queue_timeout = float(config.get("admission_queue_timeout_seconds", 5))
+    per_client = int(config.get("admission_per_client", 2))
+
+    def lane(name: str, default_concurrency: int, client_limit: Optional[int] = per_client) -> Lane:
+        concurrency = int(config.get(f"admission_{name}_concurrency", default_concurrency))
+        return Lane(name, concurrency, queue_size, queue_timeout, client_limit or 0)
+
+    # Together the lanes stay below the 40-thread default threadpool, so /health never starves
+    return {
+        "generate": lane("generate", 4),
+        "fetch": lane("fetch", 8),
+        "read": lane("read", 16, client_limit=0),
+    }
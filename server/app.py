@@ -1,21 +1,53 @@
-from fastapi import FastAPI, HTTPException
+import hmac
+import ipaddress
+import sqlite3
+import threading
+
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
 from agents.coordinator import Coordinator
+from agents.leaderboard import OutageLeaderboard, build_leaderboard
 from agents.news_agent import NewsAgent
-from main import load_config, load_prompt
+from utils.config import config_stamp, load_config, load_prompt
+from agents.ioda_agent import build_ioda_agent
+from server.admission import AdmissionController, Ticket, client_key
+from server.http_cache import (
+    IMMUTABLE,
+    NO_CACHE,
+    PRIVATE_REVALIDATE,
+    SHORT_LIVED,
+    CompressionMiddleware,
+    cached_json,
+    conditional_response,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+)
+from server.jobs import JobQueueFull, JobRegistry
+from server.live import LiveHub, build_status_fetcher
+from utils.downsample import METHODS, SeriesCache
+from utils.profiling import ProfileStore, RequestProfile, profiled, sampled
+from utils.report_store import ReportStore
+from utils.signals import iter_series
 
 
 class ReportRequest(BaseModel):
     location: Optional[str] = None
-    hours: Optional[int] = None
+    hours: Optional[int] = Field(None, ge=1, le=24 * 31)
     use_llm: Optional[bool] = None
     model: Optional[str] = None
     image_base64: Optional[str] = None
     articles: Optional[list] = None
+    chunk_hours: Optional[float] = Field(None, ge=1)  # Fetch IODA data in parallel chunks of this size
+    mode: Optional[str] = None  # "llm" (default) or "fast" for the template engine only
+    instant: Optional[bool] = None  # Return the template report now, LLM report via /report/jobs/{id}
+    incremental: Optional[bool] = None  # Regenerate only sections whose inputs changed
+    points: Optional[int] = None  # Also return the IODA series downsampled to this many points
 
 
 def build_coordinator(overrides: Optional[dict] = None) -> Tuple[Coordinator, dict]:
@@ -28,40 +60,133 @@ def build_coordinator(overrides: Optional[dict] = None) -> Tuple[Coordinator, di
 
 app = FastAPI(title="Network Outage Reporter API", version="0.1.0")
 
+# Background LLM reports for instant /report; bounded like the generate lane's queue
+report_jobs = JobRegistry(max_workers=4, max_pending=16)
+# Per-lane concurrency limits with bounded queues; see server/admission.py
+admission = AdmissionController(lambda: load_config("configs/config.yaml"))
+
+# Guards the lazily built singletons below: first requests may arrive concurrently on worker threads
+_init_lock = threading.Lock()
+_leaderboard: Optional[OutageLeaderboard] = None
+_live_hub: Optional[LiveHub] = None
+_series_cache: Optional[SeriesCache] = None
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Dev-friendly; restrict in production
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Profile-Id"],
 )
+# Reports and article lists are large, repetitive text: compress them (brotli if installed, else gzip)
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 
 @app.get("/health")
-def health():
+async def health():
+    # Async and ungated: answers from the event loop even when every worker thread is busy
     return {"status": "ok"}
 
 
-@app.get("/config")
-def get_config():
+@app.get("/health/admission")
+async def admission_stats():
+    """Active, queued and shed requests per admission lane."""
+    return admission.stats()
+
+
+@app.get("/config", dependencies=[Depends(admission.slot("read"))])
+def get_config(request: Request):
+    # Validated against the file's modification stamp, before the YAML is even read
+    stamp = config_stamp("configs/config.yaml")
+    etag = make_etag("config", stamp)
+    last_modified = datetime.utcfromtimestamp(stamp[0] / 1e9)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, SHORT_LIVED, last_modified)
+
     cfg = load_config("configs/config.yaml")
-    return {
+    return cached_json({
         "default_location": cfg.get("default_location", "Sanaa, Yemen"),
         "default_window_hours": int(cfg.get("default_window_hours", 4)),
         "llm_provider": cfg.get("llm_provider", "none"),
         "use_llm": bool(cfg.get("use_llm", False)),
         "model": cfg.get("openai_model", ""),
-    }
+    }, etag, SHORT_LIVED, last_modified)
 
 
 @app.post("/report")
-def create_report(req: ReportRequest):
+async def create_report(req: ReportRequest, request: Request, ticket: Ticket = Depends(admission.slot("generate", degrade=True))):
+    # Async so that waiting on the LLM holds no threadpool thread; blocking
+    # fetches, hashing and store access still run in the threadpool
+    if not ticket.admitted:
+        return await run_in_threadpool(shed_report, req, ticket)
+    profile = start_profile(
+        request,
+        "/report",
+        {
+            "location": req.location,
+            "hours": req.hours,
+            "mode": req.mode,
+            "model": req.model,
+            "use_llm": req.use_llm,
+            "instant": req.instant,
+            "incremental": req.incremental,
+            "chunk_hours": req.chunk_hours,
+            "points": req.points,
+            "articles": len(req.articles) if req.articles else None,
+            "image": bool(req.image_base64) or None,
+        },
+    )
+    if profile is None:
+        return await report_response(req, request, None)
+    try:
+        response = await report_response(req, request, profile)
+    except HTTPException as e:
+        await run_in_threadpool(save_profile, profile, e.status_code)
+        raise
+    response.headers["X-Profile-Id"] = str(await run_in_threadpool(save_profile, profile, response.status_code))
+    return response
+
+
+@app.get("/report")
+async def read_report(
+    request: Request,
+    location: Optional[str] = Query(None),
+    hours: Optional[int] = Query(None, ge=1, le=24 * 31),
+    mode: Optional[str] = Query(None, description="llm or fast"),
+    model: Optional[str] = Query(None),
+    use_llm: Optional[bool] = Query(None),
+    incremental: Optional[bool] = Query(None),
+    chunk_hours: Optional[float] = Query(None, ge=1),
+    points: Optional[int] = Query(None),
+    ticket: Ticket = Depends(admission.slot("generate", degrade=True)),
+):
+    """Cacheable form of ``POST /report`` for requests without articles or an image.
+
+    Send the previous ETag in ``If-None-Match`` to get a 304 while the inputs are unchanged.
+    """
+    req = ReportRequest(
+        location=location, hours=hours, mode=mode, model=model, use_llm=use_llm,
+        incremental=incremental, chunk_hours=chunk_hours, points=points,
+    )
+    return await create_report(req, request, ticket)
+
+
+async def report_response(req: ReportRequest, request: Request, profile: Optional[RequestProfile]) -> Response:
     try:
         overrides = {}
         if req.use_llm is not None:
             overrides["use_llm"] = req.use_llm
         if req.model:
             overrides["openai_model"] = req.model
+        if req.incremental is not None:
+            overrides["incremental_refresh"] = req.incremental
+        if req.mode:
+            if req.mode not in ("llm", "fast"):
+                raise HTTPException(status_code=422, detail="mode must be 'llm' or 'fast'")
+            overrides["report_mode"] = req.mode
+        if req.points is not None and not 3 <= req.points <= 5000:
+            raise HTTPException(status_code=422, detail="points must be between 3 and 5000")
 
         coordinator, cfg = build_coordinator(overrides)
 
@@ -70,46 +195,391 @@ def create_report(req: ReportRequest):
         end_time = datetime.utcnow()
         start_time = end_time - timedelta(hours=hours)
 
-        # Build visualization URL for IODA dashboard
-        visualization_url = coordinator.ioda_agent.get_visualization_url(location, start_time, end_time)
-        
-        # If articles were provided, generate directly from inputs; otherwise run the full pipeline
+        # If articles were provided, generate directly from them; otherwise fetch everything automatically
         if req.articles:
-            # User provided articles - use them directly
-            report = coordinator.report_agent.generate_report(
-                location=location,
-                outage_data=None,
-                news_articles=req.articles or [],
-                visualization_url=visualization_url,
-                image_base64=req.image_base64,
-            )
+            inputs = {
+                "outage_data": None,
+                "news_articles": req.articles or [],
+                # Build visualization URL for IODA dashboard
+                "visualization_url": coordinator.ioda_agent.get_visualization_url(location, start_time, end_time),
+            }
         else:
-            # Fetch everything automatically
-            report = coordinator.run(location, start_time, end_time, image_base64=req.image_base64)
+            inputs = await run_in_threadpool(
+                profiled(profile, coordinator.collect_inputs), location, start_time, end_time, chunk_hours=req.chunk_hours
+            )
 
-        return {
+        # The ETag is the fingerprint of everything the report is generated from, so a client
+        # holding the current report gets a 304 (GET) without any generation work
+        input_hash = await run_in_threadpool(
+            profiled(profile, coordinator.input_hash),
+            location, start_time, end_time, inputs["outage_data"], inputs["news_articles"], image_base64=req.image_base64,
+        )
+        etag = make_etag("report", input_hash, req.instant, coordinator.incremental_refresh, req.points, weak=True)
+        conditional = conditional_response(request, etag, PRIVATE_REVALIDATE)
+        if conditional is not None:
+            return conditional
+
+        response = {
             "location": location,
             "hours": hours,
             "generated_at": end_time.isoformat(),
-            "report": report,
         }
+        if req.points:
+            # Same per-resolution view cache as /series, keyed by the inputs' fingerprint
+            reduced = await run_in_threadpool(
+                profiled(profile, get_series_cache().view), ("report", input_hash), inputs["outage_data"], req.points
+            )
+            response["series"] = list(iter_series(reduced))
+
+        agent = coordinator.report_agent
+        if req.instant and agent.llm_enabled:
+            cached = await run_in_threadpool(
+                profiled(profile, coordinator.cached_report), location, start_time, end_time,
+                image_base64=req.image_base64, input_hash=input_hash, **inputs,
+            )
+            if cached is None:
+                # Answer now from the template engine; the LLM report follows in the background
+                try:
+                    job_id = report_jobs.submit(
+                        coordinator.generate, location, start_time, end_time,
+                        image_base64=req.image_base64, input_hash=input_hash, **inputs,
+                    )
+                except JobQueueFull:
+                    # Too much background generation already: serve only the template report
+                    job_id = None
+                # No ETag: the final report for these inputs is still being written
+                instant = cached_json({
+                    **response,
+                    "report": await run_in_threadpool(
+                        profiled(profile, agent.generate_fast_report), location, image_base64=req.image_base64, **inputs
+                    ),
+                    "report_id": None,
+                    "cached": False,
+                    "mode": "fast",
+                    "pending_job_id": job_id,
+                    **({} if job_id else {"shed": True}),
+                }, None, "no-store")
+                if job_id is None:
+                    instant.headers["Retry-After"] = str(admission.lanes["generate"].retry_after())
+                return instant
+            report = cached
+        elif profile is not None:
+            # Profiled requests generate on the sync path, so the whole run is on one profiled thread
+            report = await run_in_threadpool(
+                profiled(profile, coordinator.generate), location, start_time, end_time,
+                image_base64=req.image_base64, input_hash=input_hash, **inputs,
+            )
+        else:
+            report = await coordinator.agenerate(
+                location, start_time, end_time, image_base64=req.image_base64, input_hash=input_hash, **inputs
+            )
+
+        failed = bool(agent.last_error)
+        return cached_json({
+            **response,
+            "report": report,
+            "report_id": coordinator.last_report_id,
+            "cached": coordinator.last_report_cached,
+            "mode": "llm" if agent.llm_enabled else "fast",
+            "regenerated_sections": coordinator.last_regenerated_sections,
+        }, None if failed else etag, "no-store" if failed else PRIVATE_REVALIDATE)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def shed_report(req: ReportRequest, ticket: Ticket):
+    """Answer a shed /report with the newest stored report for the location, if any."""
+    cfg = load_config("configs/config.yaml")
+    location = req.location or cfg.get("default_location", "Sanaa, Yemen")
+    retry_headers = {"Retry-After": str(ticket.retry_after)}
+    stored = None
+    if cfg.get("report_store_path", "outputs/reports.db"):
+        stored = get_report_store().latest(location)
+    if stored is None:
+        raise HTTPException(status_code=ticket.status_code, detail=ticket.detail, headers=retry_headers)
+    response = cached_json({
+        "location": location,
+        "hours": stored["window_hours"],
+        "generated_at": stored["created_at"],
+        "report": stored["report"],
+        "report_id": stored["id"],
+        "cached": True,
+        "mode": "stored",
+        "shed": True,  # live generation was shed; this is the latest stored report
+    }, None, "no-store")
+    response.headers["Retry-After"] = retry_headers["Retry-After"]
+    return response
+
+
+@app.get("/report/jobs/{job_id}", dependencies=[Depends(admission.slot("read"))])
+def get_report_job(job_id: str):
+    """Collect the LLM report started by an instant /report request."""
+    job = report_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"job_id": job_id, "status": job["status"], "report": job["result"], "error": job["error"]}
+
+
+def get_profile_store(cfg: Optional[dict] = None) -> Optional[ProfileStore]:
+    cfg = cfg or load_config("configs/config.yaml")
+    path = cfg.get("profile_store_path", "outputs/profiles.db")
+    return ProfileStore(path, max_rows=int(cfg.get("profile_max_rows", 500))) if path else None
+
+
+def is_admin(request: Request, cfg: dict) -> bool:
+    """With ``admin_token`` set, callers must send it; without one, only loopback clients are admins."""
+    token = cfg.get("admin_token")
+    if token:
+        return hmac.compare_digest(request.headers.get("x-admin-token", ""), str(token))
+    try:
+        return ipaddress.ip_address(client_key(request, admission.trusted_proxies)).is_loopback
+    except ValueError:
+        return False
+
+
+def require_admin(request: Request) -> None:
+    if not is_admin(request, load_config("configs/config.yaml")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+def start_profile(request: Request, name: str, metadata: Optional[dict] = None) -> Optional[RequestProfile]:
+    """Profile this request if asked to (X-Profile header or ?profile=1) or if it is sampled.
+
+    With ``admin_token`` set, only admins can ask for a profile.
+    """
+    cfg = load_config("configs/config.yaml")
+    if not cfg.get("profile_store_path", "outputs/profiles.db"):
+        return None
+    trigger = None
+    if request.headers.get("x-profile", "").lower() in ("1", "true", "yes"):
+        trigger = "header"
+    elif request.query_params.get("profile", "").lower() in ("1", "true", "yes"):
+        trigger = "query"
+    if trigger and not is_admin(request, cfg):
+        trigger = None
+    if trigger is None and sampled(float(cfg.get("profile_sample_percent", 0))):
+        trigger = "sample"
+    return RequestProfile("http", name, trigger, metadata=metadata) if trigger else None
+
+
+def save_profile(profile: RequestProfile, status: int) -> int:
+    return get_profile_store().save(profile, status)
+
+
+def get_report_store() -> ReportStore:
+    cfg = load_config("configs/config.yaml")
+    path = cfg.get("report_store_path", "outputs/reports.db")
+    if not path:
+        raise HTTPException(status_code=404, detail="Report store is disabled")
+    return ReportStore(path)
+
+
+@app.get("/reports", dependencies=[Depends(admission.slot("read"))])
+def list_reports(
+    request: Request,
+    location: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """List stored reports (metadata only), newest first."""
+    store = get_report_store()
+    etag = make_etag("reports", store.version(), location, since, until, limit, offset)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, NO_CACHE)
+    return cached_json(store.list(location=location, since=since, until=until, limit=limit, offset=offset), etag, NO_CACHE)
+
+
+@app.get("/reports/search", dependencies=[Depends(admission.slot("read"))])
+def search_reports(
+    request: Request,
+    q: str,
+    location: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+):
+    """Full-text search over stored report text."""
+    store = get_report_store()
+    etag = make_etag("search", store.version(), q, location, since, until, limit, offset)
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, NO_CACHE)
+    try:
+        results = store.search(q, location=location, since=since, until=until, limit=limit, offset=offset)
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    return cached_json(results, etag, NO_CACHE)
+
+
+@app.get("/reports/{report_id}", dependencies=[Depends(admission.slot("read"))])
+def get_report(report_id: int, request: Request):
+    report = get_report_store().get(report_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    # Stored reports never change
+    etag = make_etag("stored-report", report_id, report["created_at"])
+    last_modified = datetime.fromisoformat(report["created_at"])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, IMMUTABLE, last_modified)
+    return cached_json(report, etag, IMMUTABLE, last_modified)
+
+
+def get_leaderboard() -> OutageLeaderboard:
+    global _leaderboard
+    with _init_lock:
+        if _leaderboard is None:
+            _leaderboard = build_leaderboard(load_config("configs/config.yaml"))
+        return _leaderboard
+
+
+@app.get("/outages/top", dependencies=[Depends(admission.slot("read"))])
+def top_outages(
+    request: Request,
+    limit: int = Query(20, ge=1, le=250),
+    min_score: float = Query(0.0, ge=0, le=100),
+):
+    """Entities ranked by current outage score, served from the precomputed table."""
+    result = get_leaderboard().top(limit=limit, min_score=min_score)
+    if result["status"] != "ready":
+        return cached_json(result, None, "no-store")
+    # The table only changes on refresh
+    etag = make_etag("outages", result["generated_at"], limit, min_score)
+    last_modified = datetime.fromisoformat(result["generated_at"])
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, SHORT_LIVED, last_modified)
+    return cached_json(result, etag, SHORT_LIVED, last_modified)
+
+
+def get_live_hub() -> LiveHub:
+    global _live_hub
+    with _init_lock:
+        if _live_hub is None:
+            cfg = load_config("configs/config.yaml")
+            fetch_status = build_status_fetcher(
+                build_ioda_agent(cfg),
+                window_hours=float(cfg.get("live_window_hours", 6)),
+            )
+            _live_hub = LiveHub(
+                fetch_status,
+                poll_seconds=float(cfg.get("live_poll_seconds", 60)),
+                max_locations=int(cfg.get("live_max_locations", 100)),
+                max_per_socket=int(cfg.get("live_max_subscriptions_per_socket", 10)),
+            )
+        return _live_hub
+
+
+@app.websocket("/ws/live")
+async def live_status(websocket: WebSocket):
+    """Push outage status for subscribed locations: a snapshot first, then only changes."""
+    await get_live_hub().handle(websocket)
+
+
+def get_series_cache() -> SeriesCache:
+    global _series_cache
+    with _init_lock:
+        if _series_cache is None:
+            cfg = load_config("configs/config.yaml")
+            ioda_agent = build_ioda_agent(cfg)
+            _series_cache = SeriesCache(
+                ioda_agent.fetch_outage_data,
+                bucket_seconds=int(cfg.get("series_cache_seconds", 300)),
+            )
+        return _series_cache
+
+
+@app.get("/series", dependencies=[Depends(admission.slot("fetch"))])
+def get_series(
+    request: Request,
+    location: Optional[str] = None,
+    hours: Optional[int] = Query(None, ge=1, le=24 * 31),
+    points: int = Query(300, ge=3, le=5000),
+    method: str = "lttb",
+):
+    """IODA series for a location, downsampled for charts; each resolution is computed once per fetch."""
+    if method not in METHODS:
+        raise HTTPException(status_code=422, detail=f"method must be one of: {', '.join(METHODS)}")
+    cfg = load_config("configs/config.yaml")
+    location = location or cfg.get("default_location", "Sanaa, Yemen")
+    hours = int(hours or cfg.get("default_window_hours", 4))
+
+    outage_data, start_time, end_time = get_series_cache().get(location, hours, points, method)
+    if outage_data is None:
+        raise HTTPException(status_code=502, detail="IODA data is unavailable")
+    etag = make_etag("series", location, hours, end_time, points, method)
+    if is_not_modified(request, etag, end_time):
+        return not_modified_response(etag, SHORT_LIVED, end_time)
+    return cached_json({
+        "location": location,
+        "hours": hours,
+        "start": start_time.isoformat(),
+        "end": end_time.isoformat(),
+        "points": points,
+        "method": method,
+        "series": list(iter_series(outage_data)),
+    }, etag, SHORT_LIVED, end_time)
+
+
 class NewsRequest(BaseModel):
     query: str
     hours: Optional[int] = 24
 
 
-@app.post("/news")
-def fetch_news(req: NewsRequest):
+@app.post("/news", dependencies=[Depends(admission.slot("fetch"))])
+def fetch_news(req: NewsRequest, request: Request):
     try:
         cfg = load_config("configs/config.yaml")
         agent = NewsAgent(cfg.get("news_api_key"))
         to_date = datetime.utcnow()
         from_date = to_date - timedelta(hours=int(req.hours or 24))
         articles = agent.fetch_news(req.query, from_date, to_date)
-        return {"articles": articles}
+        etag = make_etag("news", articles)
+        conditional = conditional_response(request, etag, PRIVATE_REVALIDATE)
+        if conditional is not None:
+            return conditional
+        return cached_json({"articles": articles}, etag, PRIVATE_REVALIDATE)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def get_profile_store_or_404() -> ProfileStore:
+    store = get_profile_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return store
+
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin), Depends(admission.slot("read"))])
+def list_profiles(
+    source: Optional[str] = Query(None, description="http or mcp"),
+    name: Optional[str] = Query(None, description="Endpoint path or MCP tool name"),
+    since: Optional[str] = Query(None, description="ISO timestamp"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Stored request profiles, slowest first."""
+    return {"items": get_profile_store_or_404().slowest(source=source, name=name, since=since, limit=limit)}
+
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin), Depends(admission.slot("read"))])
+def get_profile(profile_id: int):
+    """One profile with its top functions by cumulative time."""
+    profile = get_profile_store_or_404().get(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+@app.get("/admin/profiles/{profile_id}/pstats", dependencies=[Depends(require_admin), Depends(admission.slot("read"))])
+def download_profile(profile_id: int):
+    """Raw profile for ``pstats.Stats(path)`` or snakeviz."""
+    raw = get_profile_store_or_404().raw_stats(profile_id)
+    if raw is None:
+        raise HTTPException(status_code=404, detail="Profile not found or empty")
+    return Response(
+        raw,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.prof"', "Cache-Control": IMMUTABLE},
+    )
@@ -0,0 +1,203 @@
+"""HTTP caching and compression helpers for the API.
+
+Endpoints derive an ETag from a cheap fingerprint of their inputs *before*
+doing the expensive work, so a matching ``If-None-Match`` (or
+``If-Modified-Since``) is answered with 304 without recomputing anything.
+``CompressionMiddleware`` compresses large responses with brotli when the
+``brotli`` package is installed and the client accepts it, gzip otherwise.
+"""
+
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+from utils.lazy import optional_import
+
+# Cache-Control policies per kind of endpoint
+NO_CACHE = "no-cache"  # cacheable, but always revalidate with the ETag
+PRIVATE_REVALIDATE = "private, no-cache"
+SHORT_LIVED = "public, max-age=60, must-revalidate"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def make_etag(*parts: Any, weak: bool = False) -> str:
+    """ETag from a fingerprint of ``parts``.
+
+    Use ``weak=True`` when equal inputs give semantically equal but not
+    byte-identical bodies (e.g. a fresh ``generated_at`` timestamp).
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    tag = '"' + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32] + '"'
+    return "W/" + tag if weak else tag
+
+
+def http_date(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """Evaluate conditional request headers (If-None-Match takes precedence)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        if "*" in candidates:
+            return True
+        # Weak comparison, as RFC 9110 prescribes for If-None-Match: W/"x" matches "x"
+        return _opaque(etag) in {_opaque(c) for c in candidates}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None and request.method in ("GET", "HEAD"):
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def caching_headers(etag: Optional[str], cache_control: str, last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    headers = {"Cache-Control": cache_control}
+    if etag:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: Optional[str], cache_control: str, last_modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=caching_headers(etag, cache_control, last_modified))
+
+
+def precondition_failed_response(etag: Optional[str]) -> JSONResponse:
+    """412 for a matching ``If-None-Match`` on a method other than GET/HEAD (RFC 9110 §13.1.2)."""
+    return JSONResponse(
+        {"detail": "Precondition failed: the representation matches If-None-Match"},
+        status_code=412,
+        headers=caching_headers(etag, "no-store"),
+    )
+
+
+def conditional_response(request: Request, etag: Optional[str], cache_control: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """304 (GET/HEAD) or 412 (other methods) if the request's validators match, else None."""
+    if not is_not_modified(request, etag, last_modified):
+        return None
+    if request.method in ("GET", "HEAD"):
+        return not_modified_response(etag, cache_control, last_modified)
+    return precondition_failed_response(etag)
+
+
+def cached_json(payload: Any, etag: Optional[str], cache_control: str, last_modified: Optional[datetime] = None) -> JSONResponse:
+    return JSONResponse(payload, headers=caching_headers(etag, cache_control, last_modified))
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+
+def _accepted_encodings(header: str) -> Dict[str, float]:
+    accepted = {}
+    for item in header.split(","):
+        token, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.lower()] = q
+    return accepted
+
+
+class CompressionMiddleware:
+    """Compress complete (non-streaming) responses above ``minimum_size`` bytes.
+
+    Brotli is preferred when available and accepted by the client; gzip is
+    the fallback. Streaming responses and WebSocket traffic pass through.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.brotli = optional_import("brotli")
+
+    def _choose_encoding(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accepted = _accepted_encodings(value.decode("latin-1"))
+                if self.brotli is not None and accepted.get("br", 0) > 0:
+                    return "br"
+                if accepted.get("gzip", 0) > 0:
+                    return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self._choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def wrapped_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            body = message.get("body", b"")
+            headers = {k.lower(): v for k, v in start_message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            compressible = (
+                not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and b"content-encoding" not in headers
+                and content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if not compressible:
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if encoding == "br":
+                body = self.brotli.compress(body, quality=self.brotli_quality)
+            else:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+            raw_headers = [(k, v) for k, v in start_message.get("headers", []) if k.lower() not in (b"content-length", b"vary")]
+            vary = headers.get(b"vary")
+            raw_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", (vary + b", Accept-Encoding") if vary else b"Accept-Encoding"),
+            ]
+            passthrough = True
+            await send({**start_message, "headers": raw_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, wrapped_send)
@@ -0,0 +1,63 @@
+"""Background jobs for reports that finish after the HTTP response.
+
+Used by ``/report`` in instant mode: the template report is returned right
+away while the LLM report is generated here and collected later through
+``/report/jobs/{job_id}``.
+
+Unfinished jobs are bounded: once ``max_pending`` are queued or running,
+``submit`` raises ``JobQueueFull`` so callers shed instead of piling up LLM
+work behind admission control.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by ``JobRegistry.submit`` when ``max_pending`` jobs are unfinished."""
+
+
+class JobRegistry:
+    def __init__(self, max_workers: int = 4, max_pending: int = 16, ttl_seconds: float = 600):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.max_pending = max_pending
+        self.unfinished = 0
+        self.ttl_seconds = ttl_seconds
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> str:
+        """Run ``fn`` in the background and return a job id."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            if self.unfinished >= self.max_pending:
+                raise JobQueueFull(f"{self.unfinished} background report jobs are already queued or running")
+            self._prune()
+            self.unfinished += 1
+            self._jobs[job_id] = {"status": "pending", "result": None, "error": None, "finished_at": None}
+
+        def run():
+            try:
+                result, status, error = fn(*args, **kwargs), "done", None
+            except Exception as e:
+                result, status, error = None, "error", str(e)
+            with self._lock:
+                self.unfinished -= 1
+                self._jobs[job_id].update(status=status, result=result, error=error, finished_at=time.time())
+
+        self._executor.submit(run)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _prune(self) -> None:
+        # Finished jobs are kept for ttl_seconds so clients can collect them
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [k for k, j in self._jobs.items() if j["finished_at"] and j["finished_at"] < cutoff]:
+            del self._jobs[job_id]
@@ -0,0 +1,222 @@
+"""Live outage status pushed to dashboards over WebSocket.
+
+Clients subscribe to locations; the hub runs a single polling task per
+watched location, however many clients watch it, and fans each update out
+to every subscriber. After the initial snapshot only changed fields are
+sent, so upstream load scales with the number of locations watched rather
+than the number of open browser tabs.
+
+That number is bounded: a socket may watch ``max_per_socket`` locations, the
+hub at most ``max_locations``, and a location is only watched once a first
+status fetch finds IODA data for it. Locations without data are remembered
+for ``unresolved_ttl`` seconds, and a socket that keeps asking for them is
+closed.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Set
+
+from fastapi import WebSocket
+from starlette.concurrency import run_in_threadpool
+
+from agents.ioda_agent import IODAAgent
+from agents.template_report import classify_severity
+from utils.signals import summarize_outage_data
+
+
+def build_status_fetcher(ioda_agent: IODAAgent, window_hours: float) -> Callable[[str], Dict[str, Any]]:
+    """Return a function computing the current outage status of a location."""
+    def fetch_status(location: str) -> Dict[str, Any]:
+        end_time = datetime.utcnow()
+        start_time = end_time - timedelta(hours=window_hours)
+        signals = summarize_outage_data(ioda_agent.fetch_outage_data(location, start_time, end_time))
+        current_drop = max((max(0.0, 100 - s["latest_pct"]) for s in signals), default=0.0)
+        return {
+            "available": bool(signals),
+            "severity": classify_severity(current_drop) if signals else "unknown",
+            "current_drop_pct": round(current_drop, 1),
+            "datasources": {
+                s["datasource"]: {"latest_pct": s["latest_pct"], "drop_pct": s["drop_pct"], "dips": len(s["dips"])}
+                for s in signals
+            },
+        }
+    return fetch_status
+
+
+def diff_status(old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Fields of ``new`` that differ from ``old``; nested dicts are diffed one level down.
+
+    Entries that disappeared are reported as None.
+    """
+    if old is None:
+        return dict(new)
+    changes: Dict[str, Any] = {}
+    for key in set(old) | set(new):
+        before, after = old.get(key), new.get(key)
+        if before == after:
+            continue
+        if isinstance(before, dict) and isinstance(after, dict):
+            changes[key] = {k: after.get(k) for k in set(before) | set(after) if before.get(k) != after.get(k)}
+        else:
+            changes[key] = after
+    return changes
+
+
+class LiveHub:
+    def __init__(
+        self,
+        fetch_status: Callable[[str], Dict[str, Any]],
+        poll_seconds: float = 60,
+        max_locations: int = 100,
+        max_per_socket: int = 10,
+        max_rejections: int = 20,
+        unresolved_ttl: float = 600,
+    ):
+        self.fetch_status = fetch_status
+        self.poll_seconds = poll_seconds
+        self.max_locations = max_locations
+        self.max_per_socket = max_per_socket
+        self.max_rejections = max_rejections
+        self.unresolved_ttl = unresolved_ttl
+        self._subscribers: Dict[str, Set[WebSocket]] = {}
+        self._snapshots: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Location -> time.monotonic() until which it is rejected without a fetch
+        self._unresolved: "OrderedDict[str, float]" = OrderedDict()
+
+    def _watched_by(self, websocket: WebSocket) -> int:
+        return sum(1 for subscribers in self._subscribers.values() if websocket in subscribers)
+
+    async def _resolve(self, location: str) -> Optional[Dict[str, Any]]:
+        """First status of a location not yet watched, or None if IODA has no data for it."""
+        until = self._unresolved.get(location)
+        if until is not None and until > time.monotonic():
+            return None
+        try:
+            status = await run_in_threadpool(self.fetch_status, location)
+        except Exception as e:
+            print(f"Live status fetch failed for {location}: {e}")
+            status = None
+        if status and status.get("available"):
+            self._unresolved.pop(location, None)
+            return status
+        self._unresolved[location] = time.monotonic() + self.unresolved_ttl
+        self._unresolved.move_to_end(location)
+        while len(self._unresolved) > 1000:
+            self._unresolved.popitem(last=False)
+        return None
+
+    async def subscribe(self, websocket: WebSocket, location: str) -> Optional[str]:
+        """Add a subscription; returns why it was refused, or None."""
+        if websocket in self._subscribers.get(location, ()):
+            return None
+        if self._watched_by(websocket) >= self.max_per_socket:
+            return f"At most {self.max_per_socket} locations per connection"
+
+        if location not in self._tasks:
+            if len(self._tasks) >= self.max_locations:
+                return "Too many locations are being watched; try again later"
+            status = await self._resolve(location)
+            if status is None:
+                return "Unknown location, or IODA has no data for it"
+            # Another client may have started watching while we fetched
+            if location not in self._tasks:
+                if len(self._tasks) >= self.max_locations:
+                    return "Too many locations are being watched; try again later"
+                self._snapshots[location] = status
+                self._tasks[location] = asyncio.create_task(self._poll(location))
+
+        self._subscribers.setdefault(location, set()).add(websocket)
+        if location in self._snapshots:
+            await self._send(websocket, {
+                "type": "snapshot",
+                "location": location,
+                "status": self._snapshots[location],
+                "at": datetime.utcnow().isoformat(),
+            })
+        return None
+
+    async def unsubscribe(self, websocket: WebSocket, location: str) -> None:
+        subscribers = self._subscribers.get(location)
+        if subscribers is None:
+            return
+        subscribers.discard(websocket)
+        if not subscribers:
+            # Nobody is watching any more: stop polling this location
+            del self._subscribers[location]
+            self._snapshots.pop(location, None)
+            task = self._tasks.pop(location, None)
+            if task:
+                task.cancel()
+
+    async def unsubscribe_all(self, websocket: WebSocket) -> None:
+        for location in [loc for loc, subs in self._subscribers.items() if websocket in subs]:
+            await self.unsubscribe(websocket, location)
+
+    async def _poll(self, location: str) -> None:
+        # The first snapshot was fetched when the location was resolved
+        while True:
+            await asyncio.sleep(self.poll_seconds)
+            try:
+                status = await run_in_threadpool(self.fetch_status, location)
+            except Exception as e:
+                print(f"Live status fetch failed for {location}: {e}")
+                status = None
+
+            if status is not None:
+                previous = self._snapshots.get(location)
+                self._snapshots[location] = status
+                if previous is None:
+                    await self._broadcast(location, {"type": "snapshot", "location": location, "status": status})
+                else:
+                    changes = diff_status(previous, status)
+                    if changes:
+                        await self._broadcast(location, {"type": "delta", "location": location, "changes": changes})
+
+    async def _broadcast(self, location: str, message: Dict[str, Any]) -> None:
+        message["at"] = datetime.utcnow().isoformat()
+        for websocket in list(self._subscribers.get(location, ())):
+            if not await self._send(websocket, message):
+                await self.unsubscribe(websocket, location)
+
+    @staticmethod
+    async def _send(websocket: WebSocket, message: Dict[str, Any]) -> bool:
+        try:
+            await websocket.send_json(message)
+            return True
+        except Exception:
+            return False
+
+    async def handle(self, websocket: WebSocket) -> None:
+        """Serve one client: ``{"action": "subscribe" | "unsubscribe", "location": ...}`` messages."""
+        await websocket.accept()
+        rejections = 0
+        try:
+            while True:
+                message = await websocket.receive_json()
+                location = (message.get("location") or "").strip() if isinstance(message, dict) else ""
+                action = message.get("action") if isinstance(message, dict) else None
+                if not location or action not in ("subscribe", "unsubscribe"):
+                    await self._send(websocket, {"type": "error", "detail": "Expected {action: subscribe|unsubscribe, location}"})
+                    continue
+                if action == "subscribe":
+                    if len(location) > 100:
+                        refused = "Location name too long"
+                    else:
+                        refused = await self.subscribe(websocket, location)
+                    if refused:
+                        await self._send(websocket, {"type": "error", "location": location[:100], "detail": refused})
+                        rejections += 1
+                        if rejections >= self.max_rejections:
+                            await websocket.close(code=1008, reason="Too many rejected subscriptions")
+                            break
+                else:
+                    await self.unsubscribe(websocket, location)
+        except Exception:
+            # Disconnects surface here as WebSocketDisconnect
+            pass
+        finally:
+            await self.unsubscribe_all(websocket)
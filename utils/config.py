@@ -1,6 +1,8 @@
 # utils/config.py
 
+import copy
 import os
+import threading
 import yaml
 from functools import lru_cache
 
@@ -20,6 +22,49 @@ def _load_config_dict() -> dict:
     return {}
 
 
+# Parsed YAML per path, keyed by file modification stamp
+_config_cache = {}
+_config_lock = threading.Lock()
+
+
+def config_stamp(config_path):
+    """(mtime_ns, size) of the config file; changes whenever the file is edited."""
+    st = os.stat(config_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def load_config(config_path):
+    """Load config from YAML and override with environment variables.
+
+    The parsed YAML is cached until the file's modification time changes, so
+    request handlers can call this freely.
+    """
+    stamp = config_stamp(config_path)
+    with _config_lock:
+        cached = _config_cache.get(config_path)
+    if cached is None or cached[0] != stamp:
+        with open(config_path, 'r') as file:
+            parsed = yaml.safe_load(file) or {}
+        cached = (stamp, parsed)
+        with _config_lock:
+            _config_cache[config_path] = cached
+    # Callers may modify their copy
+    config = copy.deepcopy(cached[1])
+
+    # Override with environment variables if they exist
+    if os.getenv("OPENAI_API_KEY"):
+        config["openai_api_key"] = os.getenv("OPENAI_API_KEY")
+    if os.getenv("NEWSAPI_KEY"):
+        config["news_api_key"] = os.getenv("NEWSAPI_KEY")
+
+    return config
+
+
+def load_prompt(prompt_path):
+    with open(prompt_path, 'r') as file:
+        return file.read()
+
+
 @lru_cache(maxsize=1)
 def get_openai_api_key() -> str:
     # Prefer environment variable
@@ -0,0 +1,194 @@
+# utils/downsample.py
+
+"""Shape-preserving downsampling of IODA signal series.
+
+Full-resolution series carry far more points than a prompt, an MCP result or
+a chart can use. Two reducers are provided, both of which keep the first and
+last point and work on observed points only (missing values are skipped):
+
+- ``lttb``: Largest-Triangle-Three-Buckets, which picks per bucket the point
+  forming the largest triangle with its neighbours, so spikes and dips
+  survive while flat stretches collapse.
+- ``minmax``: the minimum and maximum of every bucket, which guarantees that
+  the deepest point of every dip is kept.
+
+Downsampled points are irregularly spaced, so each reduced series carries an
+explicit ``timestamps`` list next to its ``values`` (and no ``step``).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.signals import iter_series
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of the points LTTB keeps out of ``len(xs)``."""
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1][:max(threshold, 0)]
+
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        span = avg_end - avg_start
+        avg_x = sum(xs[avg_start:avg_end]) / span
+        avg_y = sum(ys[avg_start:avg_end]) / span
+
+        ax, ay = xs[a], ys[a]
+        best, best_area = -1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def minmax(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """Indices of the minimum and maximum of each bucket, in time order."""
+    n = len(xs)
+    if threshold >= n:
+        return list(range(n))
+    if threshold < 4:
+        return lttb(xs, ys, threshold)
+
+    buckets = (threshold - 2) // 2
+    size = (n - 2) / buckets
+    selected = [0]
+    for b in range(buckets):
+        start = int(b * size) + 1
+        end = min(int((b + 1) * size) + 1, n - 1)
+        if start >= end:
+            continue
+        bucket = range(start, end)
+        low = min(bucket, key=ys.__getitem__)
+        high = max(bucket, key=ys.__getitem__)
+        selected.extend(sorted({low, high}))
+    selected.append(n - 1)
+    return selected
+
+
+def downsample_series(series: Any, points: int, method: str = "lttb") -> Dict[str, Any]:
+    """Reduce one IODA series (plain or compact) to at most ``points`` points."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method {method!r}; expected one of {', '.join(METHODS)}")
+
+    start, step = series.get("from"), series.get("step")
+    xs: List[float] = []
+    ys: List[float] = []
+    for i, v in enumerate(series["values"]):
+        if v is not None and v == v:
+            xs.append(start + i * step if start is not None and step else i)
+            ys.append(v)
+
+    reducer = lttb if method == "lttb" else minmax
+    keep = reducer(xs, ys, points)
+    reduced = {k: v for k, v in series.items() if k not in ("values", "step", "nativeStep")}
+    reduced.update({
+        "timestamps": [xs[i] for i in keep],
+        "values": [ys[i] for i in keep],
+        "source_points": len(series["values"]),
+        "downsample": method,
+    })
+    return reduced
+
+
+def downsample_outage_data(outage_data: Any, points: int, method: str = "lttb") -> Any:
+    """IODA response with every series reduced to at most ``points`` points.
+
+    Responses without recognisable series are returned unchanged.
+    """
+    reduced = [downsample_series(series, points, method) for series in iter_series(outage_data)]
+    if not reduced:
+        return outage_data
+    return {**{k: v for k, v in outage_data.items() if k != "data"}, "data": [reduced]}
+
+
+class SeriesCache:
+    """Recent IODA fetches and their downsampled views.
+
+    The window end is aligned down to ``bucket_seconds`` so requests inside
+    the same bucket share one upstream fetch, and each ``(points, method)``
+    view is computed once per fetch. Failed fetches are not cached. Data the
+    caller fetched itself can share the same view cache through ``view``.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str, datetime, datetime], Any],
+        bucket_seconds: int = 300,
+        max_entries: int = 32,
+    ):
+        self.fetch = fetch
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        location: str,
+        hours: float,
+        points: Optional[int] = None,
+        method: str = "lttb",
+    ) -> Tuple[Any, datetime, datetime]:
+        """Return ``(outage_data, start_time, end_time)``, downsampled when ``points`` is set."""
+        end_epoch = int(time.time()) // self.bucket_seconds * self.bucket_seconds
+        key = (location, float(hours), end_epoch)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            end_time = datetime.utcfromtimestamp(end_epoch)
+            start_time = end_time - timedelta(hours=hours)
+            data = self.fetch(location, start_time, end_time)
+            entry = {"data": data, "views": {}, "start": start_time, "end": end_time}
+            if data is not None:
+                with self._lock:
+                    self._entries[key] = entry
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+
+        data = entry["data"]
+        if points and data is not None:
+            data = self._view(entry, int(points), method)
+        return data, entry["start"], entry["end"]
+
+    def view(self, key: Tuple, data: Any, points: int, method: str = "lttb") -> Any:
+        """``data`` downsampled, computed once per ``key`` (e.g. a fingerprint of ``data``) and resolution."""
+        cache_key = ("view",) + tuple(key)
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                entry = self._entries[cache_key] = {"data": data, "views": {}, "start": None, "end": None}
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(cache_key)
+        return self._view(entry, int(points), method)
+
+    def _view(self, entry: Dict[str, Any], points: int, method: str) -> Any:
+        view_key = (points, method)
+        with self._lock:
+            view = entry["views"].get(view_key)
+        if view is None:
+            view = downsample_outage_data(entry["data"], points, method)
+            with self._lock:
+                entry["views"][view_key] = view
+        return view
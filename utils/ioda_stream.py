@@ -0,0 +1,166 @@
+# utils/ioda_stream.py
+
+"""Incremental parser for IODA signal responses.
+
+``json.loads`` needs the whole body in memory and then builds a Python float
+object per point. ``SeriesStreamParser`` is fed the body chunk by chunk as it
+arrives and decodes every ``"values"`` array straight into an
+``array('d')`` (NaN for missing points), wrapping the enclosing object in a
+``SignalSeries``. Only the current chunk and the compact arrays are ever held,
+so peak memory grows with 8 bytes per point instead of with the raw body.
+
+Everything else in the document is decoded as ordinary JSON, so responses
+of any shape parse; a ``"values"`` array that turns out not to be numeric is
+kept as a plain list.
+"""
+
+import json
+import re
+from array import array
+from typing import Any, Iterable, List, Optional
+
+from utils.signals import SignalSeries
+
+_TOKEN = re.compile(
+    r'\s*(?:([{}\[\]:,])|("(?:[^"\\]|\\.)*")|(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null))'
+)
+_LITERALS = {"true": True, "false": False, "null": None}
+_WHITESPACE = re.compile(r"\s*")
+# A number (or literal) followed by one of these, or by the end of the chunk, may continue in the next chunk
+_NUMBER_CHARS = "0123456789.eE+-"
+
+
+class _Frame:
+    __slots__ = ("container", "key")
+
+    def __init__(self, container):
+        self.container = container
+        self.key = None
+
+
+class SeriesStreamParser:
+    def __init__(self):
+        self._buffer = ""
+        self._stack: List[_Frame] = []
+        self._values: Optional[array] = None  # set while inside a "values" array
+        self._root: Any = None
+        self._done = False
+
+    def feed(self, text: str) -> None:
+        """Consume the next chunk of the response body."""
+        self._buffer += text
+        self._parse(final=False)
+
+    def close(self) -> Any:
+        """Finish parsing and return the decoded document."""
+        self._parse(final=True)
+        if not self._done or self._buffer.strip():
+            raise ValueError("Incomplete or trailing JSON in IODA response")
+        return self._root
+
+    def _parse(self, final: bool) -> None:
+        buf = self._buffer
+        pos = 0
+        end = len(buf)
+        while pos < end:
+            if self._values is not None:
+                pos, complete = self._parse_values(buf, pos, final)
+                if not complete:
+                    break
+                continue
+
+            match = _TOKEN.match(buf, pos)
+            if match is None or (match.group(3) and not final and buf[match.end():match.end() + 1] in _NUMBER_CHARS):
+                # Partial token at the end of the chunk (or only whitespace left)
+                if final and buf[_WHITESPACE.match(buf, pos).end():]:
+                    raise ValueError(f"Invalid JSON in IODA response near: {buf[pos:pos + 40]!r}")
+                break
+            pos = match.end()
+            punct, string, scalar = match.groups()
+            if punct:
+                self._punctuation(punct)
+            elif string is not None:
+                decoded = json.loads(string) if "\\" in string else string[1:-1]
+                top = self._stack[-1] if self._stack else None
+                if top is not None and isinstance(top.container, dict) and top.key is None:
+                    top.key = decoded
+                else:
+                    self._emit(decoded)
+            else:
+                self._emit(_LITERALS[scalar] if scalar in _LITERALS else _number(scalar))
+        self._buffer = buf[pos:]
+
+    def _parse_values(self, buf: str, pos: int, final: bool):
+        """Decode numbers of a ``values`` array in bulk; returns (pos, array finished)."""
+        close = buf.find("]", pos)
+        stop = close if close != -1 else buf.rfind(",", pos)
+        if stop == -1:
+            if final:
+                raise ValueError("Unterminated values array in IODA response")
+            return pos, False
+
+        segment = buf[pos:stop]
+        if close != -1 and not segment.strip() and not self._values:
+            decoded = ()  # empty array
+        else:
+            try:
+                # float() parses "nan" (and surrounding whitespace) itself
+                decoded = array("d", map(float, segment.replace("null", "nan").split(",")))
+            except ValueError:
+                # Not a numeric series: continue with the generic parser from here
+                frame = _Frame([None if v != v else v for v in self._values])
+                self._values = None
+                self._stack.append(frame)
+                return pos, True
+        self._values.extend(decoded)
+
+        if close == -1:
+            return stop + 1, True  # past the comma; more values follow
+        values, self._values = self._values, None
+        self._emit(values)
+        return close + 1, True
+
+    def _punctuation(self, punct: str) -> None:
+        if punct == "{":
+            self._stack.append(_Frame({}))
+        elif punct == "[":
+            top = self._stack[-1] if self._stack else None
+            if top is not None and isinstance(top.container, dict) and top.key == "values":
+                self._values = array("d")
+            else:
+                self._stack.append(_Frame([]))
+        elif punct in "}]":
+            if not self._stack:
+                raise ValueError("Unbalanced JSON in IODA response")
+            container = self._stack.pop().container
+            if isinstance(container, dict) and isinstance(container.get("values"), array):
+                values = container.pop("values")
+                container = SignalSeries(container, values)
+            self._emit(container)
+        # ':' and ',' carry no information for this builder
+
+    def _emit(self, value: Any) -> None:
+        if not self._stack:
+            self._root = value
+            self._done = True
+            return
+        top = self._stack[-1]
+        if isinstance(top.container, dict):
+            top.container[top.key] = value
+            top.key = None
+        else:
+            top.container.append(value)
+
+
+def _number(token: str):
+    if "." in token or "e" in token or "E" in token:
+        return float(token)
+    return int(token)
+
+
+def parse_chunks(chunks: Iterable[str]) -> Any:
+    """Parse an IODA response from an iterable of text chunks."""
+    parser = SeriesStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
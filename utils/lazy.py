@@ -0,0 +1,25 @@
+# utils/lazy.py
+
+"""Deferred imports for heavy optional dependencies.
+
+Modules such as ``openai`` and ``httpx`` are only needed once a request
+actually reaches the network, so agents import them on first use rather than
+at module import time. This keeps the CLI, FastAPI server and MCP server fast
+to start.
+"""
+
+import importlib
+from types import ModuleType
+from typing import Optional
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    """Import ``name`` on demand, returning None if it is unavailable.
+
+    Python caches imported modules in ``sys.modules``, so repeated calls
+    after the first are cheap.
+    """
+    try:
+        return importlib.import_module(name)
+    except Exception:
+        return None
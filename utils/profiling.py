@@ -0,0 +1,198 @@
+# utils/profiling.py
+
+"""On-demand cProfile capture of single requests, stored in SQLite.
+
+A request is profiled when the caller asks for it (header, query flag or MCP
+argument) or when it falls into the sampled ``profile_sample_percent`` of
+requests. Blocking work the request runs through ``RequestProfile.call`` is
+profiled on the thread it runs on; work handed to other threads shows up as
+time spent waiting for it. Each stored profile keeps the request metadata,
+wall and CPU time, the hottest function, a text summary and the raw pstats
+data, which loads with ``pstats.Stats`` or snakeviz.
+"""
+
+import cProfile
+import functools
+import io
+import json
+import marshal
+import os
+import pstats
+import random
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    trigger TEXT NOT NULL,
+    status INTEGER,
+    wall_ms REAL,
+    cpu_ms REAL,
+    hotspot TEXT,
+    created_at TEXT NOT NULL,
+    metadata TEXT,
+    summary TEXT,
+    stats BLOB
+);
+CREATE INDEX IF NOT EXISTS idx_profiles_wall ON profiles (wall_ms);
+"""
+
+_META_COLUMNS = "id, source, name, trigger, status, wall_ms, cpu_ms, hotspot, created_at, metadata"
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def sampled(percent: float) -> bool:
+    """True for roughly ``percent`` % of calls."""
+    return percent > 0 and random.random() * 100 < percent
+
+
+def _label(func) -> str:
+    filename, line, name = func
+    return f"{os.path.basename(filename)}:{line}({name})" if line else name
+
+
+class RequestProfile:
+    """cProfile of one request, accumulated over each call made through ``call``."""
+
+    def __init__(self, source: str, name: str, trigger: str, metadata: Optional[Dict[str, Any]] = None):
+        self.source = source
+        self.name = name
+        self.trigger = trigger
+        self.metadata = {k: v for k, v in (metadata or {}).items() if v is not None}
+        self.profiler = cProfile.Profile()
+        self.started = time.perf_counter()
+        self.cpu_seconds = 0.0
+        self.skipped: Optional[str] = None
+
+    def call(self, fn: Callable, *args, **kwargs):
+        """Run ``fn`` under the profiler. Calls of one request must not overlap."""
+        try:
+            self.profiler.enable()
+        except ValueError as e:
+            # Python 3.12+ allows one active profiler per process
+            self.skipped = str(e)
+            return fn(*args, **kwargs)
+        cpu_started = time.thread_time()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.profiler.disable()
+            self.cpu_seconds += time.thread_time() - cpu_started
+
+    def stats(self) -> Optional[pstats.Stats]:
+        try:
+            return pstats.Stats(self.profiler)
+        except TypeError:
+            # Nothing ran under the profiler (e.g. a 304 or a validation error)
+            return None
+
+
+def profiled(profile: Optional[RequestProfile], fn: Callable) -> Callable:
+    """``fn`` wrapped to run under ``profile``, or ``fn`` itself without one."""
+    if profile is None:
+        return fn
+    return functools.partial(profile.call, fn)
+
+
+class ProfileStore:
+    def __init__(self, path: str, max_rows: int = 500):
+        self.path = path
+        self.max_rows = max_rows
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with _init_lock:
+            if self.path in _initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+            _initialized.add(self.path)
+
+    def save(self, profile: RequestProfile, status: Optional[int] = None, summary_lines: int = 30) -> int:
+        """Persist a finished profile and return its id; only the newest ``max_rows`` are kept."""
+        wall_ms = (time.perf_counter() - profile.started) * 1000
+        stats = profile.stats()
+        summary, hotspot, raw = profile.skipped, None, None
+        if stats is not None:
+            out = io.StringIO()
+            stats.stream = out
+            stats.sort_stats("cumulative").print_stats(summary_lines)
+            summary = out.getvalue()
+            hotspot = _label(max(stats.stats, key=lambda func: stats.stats[func][2]))
+            raw = marshal.dumps(stats.stats)
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO profiles (source, name, trigger, status, wall_ms, cpu_ms, hotspot, created_at,"
+                " metadata, summary, stats) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    profile.source,
+                    profile.name,
+                    profile.trigger,
+                    status,
+                    round(wall_ms, 2),
+                    round(profile.cpu_seconds * 1000, 2),
+                    hotspot,
+                    datetime.utcnow().isoformat(),
+                    json.dumps(profile.metadata, default=str),
+                    summary,
+                    raw,
+                ),
+            )
+            profile_id = int(cur.lastrowid)
+            if self.max_rows:
+                conn.execute("DELETE FROM profiles WHERE id <= ?", (profile_id - self.max_rows,))
+        return profile_id
+
+    def slowest(
+        self,
+        source: Optional[str] = None,
+        name: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Profile metadata, slowest wall time first."""
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column, value in (("source = ?", source), ("name = ?", name), ("created_at >= ?", since)):
+            if value:
+                clauses.append(column)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_META_COLUMNS} FROM profiles {where} ORDER BY wall_ms DESC LIMIT ?", [*params, limit]
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def get(self, profile_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_META_COLUMNS}, summary FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return self._row(row) if row else None
+
+    def raw_stats(self, profile_id: int) -> Optional[bytes]:
+        """The profile in pstats' file format (what ``Profile.dump_stats`` writes)."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT stats FROM profiles WHERE id = ?", (profile_id,)).fetchone()
+        return row["stats"] if row else None
+
+    @staticmethod
+    def _row(row: sqlite3.Row) -> Dict[str, Any]:
+        item = dict(row)
+        item["metadata"] = json.loads(item["metadata"]) if item["metadata"] else {}
+        return item
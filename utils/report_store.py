@@ -0,0 +1,241 @@
+# utils/report_store.py
+
+"""SQLite-backed store for generated reports.
+
+Every report is kept with the metadata needed to find and reuse it later:
+location, time window, model, a fingerprint of the generation inputs and the
+generation latency. Report text is indexed with FTS5 when the local SQLite
+build supports it (falling back to LIKE matching otherwise).
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.signals import update_digest
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT NOT NULL,
+    start_time TEXT,
+    end_time TEXT,
+    window_hours REAL,
+    model TEXT,
+    input_hash TEXT,
+    latency_ms REAL,
+    created_at TEXT NOT NULL,
+    report TEXT NOT NULL,
+    sections TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reports_location_created ON reports (location, created_at);
+CREATE INDEX IF NOT EXISTS idx_reports_input_hash ON reports (input_hash);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+    report, location, content='reports', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+    INSERT INTO reports_fts (rowid, report, location) VALUES (new.id, new.report, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+    INSERT INTO reports_fts (reports_fts, rowid, report, location) VALUES ('delete', old.id, old.report, old.location);
+END;
+"""
+
+_META_COLUMNS = "id, location, start_time, end_time, window_hours, model, input_hash, latency_ms, created_at"
+
+_initialized: Dict[str, bool] = {}
+_init_lock = threading.Lock()
+
+
+def fingerprint_inputs(**inputs: Any) -> str:
+    """Stable SHA-256 fingerprint of the inputs that determine a report."""
+    # Hashed as it is walked: IODA series go in as raw array bytes, never as JSON text
+    digest = hashlib.sha256()
+    update_digest(digest, inputs)
+    return digest.hexdigest()
+
+
+class ReportStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _ensure_schema(self) -> None:
+        with _init_lock:
+            if self.path in _initialized:
+                self.has_fts = _initialized[self.path]
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with self._connect() as conn:
+                conn.executescript(_SCHEMA)
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(reports)")}
+                if "sections" not in columns:
+                    # Stores created before section-level generation
+                    conn.execute("ALTER TABLE reports ADD COLUMN sections TEXT")
+                try:
+                    conn.executescript(_FTS_SCHEMA)
+                    has_fts = True
+                except sqlite3.OperationalError:
+                    # SQLite built without FTS5
+                    has_fts = False
+            _initialized[self.path] = has_fts
+            self.has_fts = has_fts
+
+    def save(
+        self,
+        location: str,
+        report: str,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        model: Optional[str] = None,
+        input_hash: Optional[str] = None,
+        latency_ms: Optional[float] = None,
+        sections: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Persist a report and return its id.
+
+        ``sections`` holds per-section text and input fingerprints for reports
+        generated section by section, so later refreshes can reuse them.
+        """
+        window_hours = None
+        if start_time and end_time:
+            window_hours = round((end_time - start_time).total_seconds() / 3600, 3)
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO reports (location, start_time, end_time, window_hours, model, input_hash,"
+                " latency_ms, created_at, report, sections) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    location,
+                    start_time.isoformat() if start_time else None,
+                    end_time.isoformat() if end_time else None,
+                    window_hours,
+                    model,
+                    input_hash,
+                    latency_ms,
+                    datetime.utcnow().isoformat(),
+                    report,
+                    json.dumps(sections) if sections else None,
+                ),
+            )
+            return int(cur.lastrowid)
+
+    def get(self, report_id: int) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT {_META_COLUMNS}, report FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return dict(row) if row else None
+
+    def version(self) -> Dict[str, Any]:
+        """Cheap marker that changes whenever a report is added or removed."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(id), COUNT(*), MAX(created_at) FROM reports").fetchone()
+        return {"last_id": row[0], "count": row[1], "last_created_at": row[2]}
+
+    def find_by_input_hash(self, input_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent report generated from identical inputs."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_META_COLUMNS}, report FROM reports WHERE input_hash = ? ORDER BY id DESC LIMIT 1",
+                (input_hash,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest(self, location: str) -> Optional[Dict[str, Any]]:
+        """Newest report for exactly this location."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {_META_COLUMNS}, report FROM reports WHERE location = ? ORDER BY id DESC LIMIT 1",
+                (location,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest_sections(self, location: str, since: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Sections of the newest sectioned report for exactly this location."""
+        query = "SELECT sections FROM reports WHERE location = ? AND sections IS NOT NULL"
+        params: List[Any] = [location]
+        if since:
+            query += " AND created_at >= ?"
+            params.append(since)
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY id DESC LIMIT 1", params).fetchone()
+        return json.loads(row["sections"]) if row else None
+
+    def list(
+        self,
+        location: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """List report metadata, newest first, filtered by location substring and creation time."""
+        clauses, params = self._filters(location, since, until)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {_META_COLUMNS} FROM reports {where} ORDER BY id DESC LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return {"items": [dict(r) for r in rows], "total": total, "limit": limit, "offset": offset}
+
+    def search(
+        self,
+        query: str,
+        location: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Full-text search over report text, best matches first."""
+        clauses, params = self._filters(location, since, until, prefix="r.")
+        columns = ", ".join(f"r.{c.strip()}" for c in _META_COLUMNS.split(","))
+        if self.has_fts:
+            clauses.insert(0, "reports_fts MATCH ?")
+            params.insert(0, query)
+            source = "reports_fts JOIN reports r ON r.id = reports_fts.rowid"
+            select = f"{columns}, snippet(reports_fts, 0, '[', ']', '…', 16) AS snippet"
+            order = "ORDER BY rank"
+        else:
+            clauses.insert(0, "r.report LIKE ?")
+            params.insert(0, f"%{query}%")
+            source = "reports r"
+            select = f"{columns}, substr(r.report, 1, 200) AS snippet"
+            order = "ORDER BY r.id DESC"
+        where = f"WHERE {' AND '.join(clauses)}"
+        with self._connect() as conn:
+            total = conn.execute(f"SELECT COUNT(*) FROM {source} {where}", params).fetchone()[0]
+            rows = conn.execute(
+                f"SELECT {select} FROM {source} {where} {order} LIMIT ? OFFSET ?",
+                [*params, limit, offset],
+            ).fetchall()
+        return {"items": [dict(r) for r in rows], "total": total, "limit": limit, "offset": offset}
+
+    @staticmethod
+    def _filters(location, since, until, prefix=""):
+        clauses: List[str] = []
+        params: List[Any] = []
+        if location:
+            clauses.append(f"{prefix}location LIKE ?")
+            params.append(f"%{location}%")
+        if since:
+            clauses.append(f"{prefix}created_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append(f"{prefix}created_at < ?")
+            params.append(until)
+        return clauses, params
@@ -0,0 +1,301 @@
+# utils/signals.py
+
+"""Helpers for working with IODA signal time series.
+
+IODA v2 answers signal queries with ``{"data": [[series, ...], ...]}`` where
+each series carries ``datasource``, ``from``, ``until``, ``step`` and a list of
+``values`` (``None`` for missing points). These helpers walk that shape so the
+agents, server and MCP tools do not each re-implement the traversal.
+
+Series may also arrive as ``SignalSeries`` (see ``utils.ioda_stream``), which
+keeps the values in a compact ``array('d')`` with NaN for missing points.
+Every helper here accepts both forms.
+"""
+
+import calendar
+import sys
+from array import array
+from collections.abc import Mapping, MutableMapping
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_NAN = float("nan")
+
+
+class SignalSeries(MutableMapping):
+    """One IODA series: metadata dict plus values in an ``array('d')``.
+
+    Behaves like the plain series dict (``series["values"]``,
+    ``series.get("datasource")``, ``{**series}``), at 8 bytes per point.
+    """
+
+    __slots__ = ("meta", "values")
+
+    def __init__(self, meta: Dict[str, Any], values: array):
+        self.meta = meta
+        self.values = values
+
+    def __getitem__(self, key):
+        return self.values if key == "values" else self.meta[key]
+
+    def __setitem__(self, key, value):
+        if key == "values":
+            self.values = value if isinstance(value, array) else array("d", (_NAN if v is None else v for v in value))
+        else:
+            self.meta[key] = value
+
+    def __delitem__(self, key):
+        if key == "values":
+            raise KeyError("values cannot be removed from a SignalSeries")
+        del self.meta[key]
+
+    def __iter__(self):
+        yield from self.meta
+        yield "values"
+
+    def __len__(self):
+        return len(self.meta) + 1
+
+    def __repr__(self):
+        return f"SignalSeries({self.meta!r}, points={len(self.values)})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain IODA series dict (NaN back to None)."""
+        return {**self.meta, "values": [None if v != v else v for v in self.values]}
+
+
+def json_default(value: Any) -> Any:
+    """``json.dumps`` default that serialises compact series like plain IODA data."""
+    if isinstance(value, SignalSeries):
+        return value.to_dict()
+    if isinstance(value, array):
+        return [None if v != v else v for v in value]
+    return str(value)
+
+
+def _as_values(value: Any) -> Optional[array]:
+    """``value`` as an ``array('d')`` (NaN for None) if it holds series values, else None."""
+    if isinstance(value, array):
+        return value
+    if isinstance(value, list):
+        try:
+            return array("d", (_NAN if v is None else v for v in value))
+        except TypeError:
+            return None
+    return None
+
+
+def update_digest(digest: Any, value: Any) -> None:
+    """Feed ``value`` into a ``hashlib`` digest without serialising it first.
+
+    Series values are hashed as the raw buffer of their ``array('d')``, so a
+    compact ``SignalSeries`` and the equivalent plain series dict hash alike
+    and no per-point objects or JSON text are built. Mapping keys are hashed
+    in sorted order, and every item is tagged and length-prefixed so that
+    different structures cannot collide.
+    """
+    if isinstance(value, Mapping):
+        digest.update(b"{")
+        for key in sorted(value, key=str):
+            update_digest(digest, str(key))
+            values = _as_values(value[key]) if key == "values" else None
+            if values is not None:
+                _update_values(digest, values)
+            else:
+                update_digest(digest, value[key])
+        digest.update(b"}")
+    elif isinstance(value, array):
+        _update_values(digest, value)
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[%d:" % len(value))
+        for item in value:
+            update_digest(digest, item)
+        digest.update(b"]")
+    elif value is None:
+        digest.update(b"n")
+    elif isinstance(value, bool):
+        digest.update(b"t" if value else b"f")
+    elif isinstance(value, int):
+        digest.update(b"i%d;" % value)
+    elif isinstance(value, float):
+        digest.update(b"d" + repr(value).encode() + b";")
+    else:
+        text = (value if isinstance(value, str) else str(value)).encode("utf-8")
+        digest.update(b"s%d:" % len(text))
+        digest.update(text)
+
+
+def _update_values(digest: Any, values: array) -> None:
+    if values.typecode != "d" or sys.byteorder == "big":
+        # Little-endian doubles everywhere, so stored fingerprints match across machines
+        values = array("d", values)
+        if sys.byteorder == "big":
+            values.byteswap()
+    digest.update(b"a%d:" % len(values))
+    digest.update(memoryview(values))
+
+
+def to_epoch(value: datetime) -> int:
+    """Return unix seconds for a datetime; naive values are treated as UTC."""
+    if value.tzinfo is None:
+        return calendar.timegm(value.utctimetuple())
+    return int(value.timestamp())
+
+
+def chunk_windows(start_time: datetime, end_time: datetime, chunk: timedelta) -> List[Tuple[datetime, datetime]]:
+    """Split ``[start_time, end_time)`` into windows aligned to ``chunk``.
+
+    Boundaries fall on multiples of the chunk length since the epoch, so the
+    same range always splits the same way (only the first and last windows
+    may be partial).
+    """
+    size = int(chunk.total_seconds())
+    if size <= 0 or end_time <= start_time:
+        return [(start_time, end_time)]
+
+    start_epoch = to_epoch(start_time)
+    end_epoch = to_epoch(end_time)
+    windows = []
+    cursor = start_epoch
+    while cursor < end_epoch:
+        boundary = min((cursor // size + 1) * size, end_epoch)
+        windows.append((
+            start_time + timedelta(seconds=cursor - start_epoch),
+            start_time + timedelta(seconds=boundary - start_epoch),
+        ))
+        cursor = boundary
+    return windows
+
+
+def iter_series(outage_data: Any) -> Iterator[Dict[str, Any]]:
+    """Yield every series dict found in an IODA signals response."""
+    if not isinstance(outage_data, dict):
+        return
+    data = outage_data.get("data")
+    if not isinstance(data, list):
+        return
+    for group in data:
+        for series in (group if isinstance(group, list) else [group]):
+            if isinstance(series, SignalSeries) or (isinstance(series, dict) and isinstance(series.get("values"), list)):
+                yield series
+
+
+def series_key(series: Dict[str, Any]) -> Tuple:
+    """Identity of a series across chunks of the same query."""
+    return (
+        series.get("entityType"),
+        series.get("entityCode"),
+        series.get("datasource"),
+        series.get("subtype"),
+    )
+
+
+def merge_series_chunks(chunks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Stitch chunked IODA responses (ordered by time) into one response.
+
+    Values of the same series are concatenated; gaps between chunks are
+    padded with ``None`` and overlapping points are dropped, so the merged
+    series stays continuous on its ``step`` grid. Returns None when none of
+    the chunks contain recognisable series.
+    """
+    merged: Dict[Tuple, Dict[str, Any]] = {}
+    envelope: Optional[Dict[str, Any]] = None
+
+    for chunk in chunks:
+        for series in iter_series(chunk):
+            if envelope is None:
+                envelope = {k: v for k, v in chunk.items() if k != "data"}
+            key = series_key(series)
+            current = merged.get(key)
+            if current is None:
+                if isinstance(series, SignalSeries):
+                    merged[key] = SignalSeries(dict(series.meta), array("d", series.values))
+                else:
+                    merged[key] = {**series, "values": list(series["values"])}
+                continue
+
+            step = current.get("step") or series.get("step")
+            values = series["values"]
+            if step and current.get("from") is not None and series.get("from") is not None:
+                expected = current["from"] + len(current["values"]) * step
+                offset = (series["from"] - expected) // step
+                if offset > 0:
+                    missing = _NAN if isinstance(current, SignalSeries) else None
+                    current["values"].extend([missing] * offset)
+                elif offset < 0:
+                    values = values[-offset:]
+            current["values"].extend(values)
+            if series.get("until") is not None:
+                current["until"] = max(current.get("until") or 0, series["until"])
+
+    if envelope is None:
+        return None
+    return {**envelope, "data": [list(merged.values())]}
+
+
+def summarize_series(series: Dict[str, Any], dip_threshold: float = 0.8) -> Optional[Dict[str, Any]]:
+    """Reduce one series to the figures reports and rankings are built from.
+
+    The baseline is the median of the observed values. A dip is a run of
+    points below ``dip_threshold`` times the baseline; each dip records its
+    start/end timestamps and its deepest value relative to the baseline.
+    Returns None for series without any observed values.
+    """
+    values = series["values"]
+    # Missing points are None in plain series and NaN in compact ones (NaN != NaN)
+    observed = [v for v in values if v is not None and v == v]
+    if not observed:
+        return None
+
+    ordered = sorted(observed)
+    mid = len(ordered) // 2
+    baseline = ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+    latest = observed[-1]
+    lowest = ordered[0]
+    start = series.get("from")
+    step = series.get("step")
+
+    dips = []
+    if baseline > 0:
+        cutoff = baseline * dip_threshold
+        dip_start = None
+        dip_low = None
+        for i, v in enumerate(values):
+            if v is not None and v < cutoff:
+                if dip_start is None:
+                    dip_start, dip_low = i, v
+                else:
+                    dip_low = min(dip_low, v)
+            elif dip_start is not None and v is not None and v == v:
+                dips.append((dip_start, i, dip_low))
+                dip_start = None
+        if dip_start is not None:
+            dips.append((dip_start, len(values), dip_low))
+
+    timestamps = series.get("timestamps")  # downsampled series are irregularly spaced
+
+    def timestamp(index):
+        if timestamps is not None:
+            return timestamps[index] if index < len(timestamps) else series.get("until")
+        return start + index * step if start is not None and step else None
+
+    return {
+        "datasource": series.get("datasource") or "unknown",
+        "entity": series.get("entityName") or series.get("entityCode"),
+        "points": len(observed),
+        "baseline": baseline,
+        "latest": latest,
+        "min": lowest,
+        "drop_pct": round((1 - lowest / baseline) * 100, 1) if baseline > 0 else 0.0,
+        "latest_pct": round(latest / baseline * 100, 1) if baseline > 0 else 100.0,
+        "dips": [
+            {"start": timestamp(a), "end": timestamp(b), "depth_pct": round((1 - low / baseline) * 100, 1)}
+            for a, b, low in dips
+        ],
+    }
+
+
+def summarize_outage_data(outage_data: Any) -> List[Dict[str, Any]]:
+    """Summaries of every series in an IODA response, worst drop first."""
+    summaries = [s for s in (summarize_series(series) for series in iter_series(outage_data)) if s]
+    return sorted(summaries, key=lambda s: s["drop_pct"], reverse=True)
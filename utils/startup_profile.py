@@ -0,0 +1,76 @@
+# utils/startup_profile.py
+
+"""Measure import-time cost of the entry points.
+
+Each target module is imported in a fresh interpreter with ``-X importtime``
+so results reflect a real cold start, not modules already cached by the
+calling process.
+"""
+
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+DEFAULT_TARGETS = ["main", "server.app", "mcp_server"]
+
+
+def profile_import(module: str, cwd: str = ".") -> Dict:
+    """Import ``module`` in a subprocess and return per-module timings.
+
+    Returns a dict with ``module``, ``ok``, ``total_ms`` and ``modules``, the
+    latter a list of ``{"name", "depth", "self_ms", "cumulative_ms"}`` entries
+    in the order Python reports them.
+    """
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    modules: List[Dict] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        modules.append({
+            "name": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+
+    # importtime lists children before their parent, so the target's own
+    # imports are the block just above its line; anything earlier belongs to
+    # interpreter startup (site, encodings, ...)
+    end = next((i for i, m in enumerate(modules) if m["name"] == module and m["depth"] == 0), None)
+    total = None
+    if end is not None:
+        start = end
+        while start > 0 and modules[start - 1]["depth"] > 0:
+            start -= 1
+        total = modules[end]["cumulative_ms"]
+        modules = modules[start:end + 1]
+
+    return {
+        "module": module,
+        "ok": proc.returncode == 0,
+        "total_ms": total if total is not None else sum(m["self_ms"] for m in modules),
+        "modules": modules,
+    }
+
+
+def format_profile(result: Dict, top: int = 15) -> str:
+    """Render a profile as a short text table of the slowest modules."""
+    status = "" if result["ok"] else "  (import failed)"
+    lines = [f"{result['module']}: {result['total_ms']:.1f} ms{status}"]
+    # Direct imports only, so a package and its submodules are not counted twice
+    roots = [m for m in result["modules"] if m["depth"] == 1]
+    for m in sorted(roots, key=lambda m: m["cumulative_ms"], reverse=True)[:top]:
+        lines.append(f"  {m['cumulative_ms']:9.1f} ms  {m['name']}")
+    return "\n".join(lines)
@@ -1,4 +1,4 @@
-import { useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import ReactMarkdown from 'react-markdown'
 import jsPDF from 'jspdf'
 import html2canvas from 'html2canvas'
@@ -12,7 +12,27 @@ type ReportResponse = {
   report: string
 }
 
+type LiveStatus = {
+  available?: boolean
+  severity?: string
+  current_drop_pct?: number
+  datasources?: Record<string, { latest_pct?: number; drop_pct?: number; dips?: number } | null>
+}
+
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
+const WS_URL = API_URL.replace(/^http/, 'ws') + '/ws/live'
+
+// Apply a delta pushed by /ws/live: top-level fields replace, datasources merge one level down
+function applyDelta(status: LiveStatus, changes: LiveStatus): LiveStatus {
+  const next: LiveStatus = { ...status, ...changes }
+  if (changes.datasources) {
+    next.datasources = { ...(status.datasources || {}) }
+    for (const [name, fields] of Object.entries(changes.datasources)) {
+      next.datasources[name] = fields === null ? null : { ...(status.datasources?.[name] || {}), ...fields }
+    }
+  }
+  return next
+}
 
 export default function App() {
   const [location, setLocation] = useState('Sanaa, Yemen')
@@ -30,6 +50,41 @@ export default function App() {
   const [showEditModal, setShowEditModal] = useState(false)
   const [editedReport, setEditedReport] = useState('')
   const [tempEditReport, setTempEditReport] = useState('')
+  const [liveStatus, setLiveStatus] = useState<LiveStatus | null>(null)
+  const socketRef = useRef<WebSocket | null>(null)
+  const watchedRef = useRef<string | null>(null)
+
+  // One socket per tab; the server polls each location once for all viewers
+  useEffect(() => {
+    const socket = new WebSocket(WS_URL)
+    socketRef.current = socket
+    socket.onopen = () => {
+      if (watchedRef.current) socket.send(JSON.stringify({ action: 'subscribe', location: watchedRef.current }))
+    }
+    socket.onmessage = (event) => {
+      const msg = JSON.parse(event.data)
+      if (msg.location !== watchedRef.current) return
+      if (msg.type === 'snapshot') setLiveStatus(msg.status)
+      else if (msg.type === 'delta') setLiveStatus(s => applyDelta(s || {}, msg.changes))
+    }
+    socket.onerror = () => console.warn('Live status unavailable')
+    return () => socket.close()
+  }, [])
+
+  // Follow the location input (debounced so typing does not churn subscriptions)
+  useEffect(() => {
+    const timer = setTimeout(() => {
+      const socket = socketRef.current
+      const next = location.trim() || null
+      if (next === watchedRef.current) return
+      const open = socket && socket.readyState === WebSocket.OPEN
+      if (open && watchedRef.current) socket!.send(JSON.stringify({ action: 'unsubscribe', location: watchedRef.current }))
+      watchedRef.current = next
+      setLiveStatus(null)
+      if (open && next) socket!.send(JSON.stringify({ action: 'subscribe', location: next }))
+    }, 600)
+    return () => clearTimeout(timer)
+  }, [location])
 
   function onImageChange(f: File | null) {
     setImageFile(f)
@@ -205,7 +260,16 @@ export default function App() {
           <div className="title">Network Outage Reporter</div>
           <div className="subtitle">Upload an image, pick the news, and generate a clear report.</div>
         </div>
-        <div className="pill">API: {API_URL.replace(/^https?:\/\//,'')}</div>
+        <div className="row" style={{ gap: 8 }}>
+          {liveStatus && (
+            <div className="pill" title="Live IODA status, pushed by the server">
+              {liveStatus.available === false
+                ? '📡 Live: no data'
+                : `📡 Live: ${liveStatus.severity} (${liveStatus.current_drop_pct ?? 0}% down)`}
+            </div>
+          )}
+          <div className="pill">API: {API_URL.replace(/^https?:\/\//,'')}</div>
+        </div>
       </div>
 
       {error && <div className="error" role="alert">⚠️ {error}</div>}